@@ -0,0 +1,237 @@
+import hashlib
+import html
+import io
+import json
+import os
+import re
+from typing import Dict, List, Optional
+
+from PIL import Image, features
+
+
+# Responsive widths generated for every region (never upscaled past the crop)
+DEFAULT_WIDTHS = [320, 640, 1024, 1600]
+ASSETS_FOLDER = "assets"
+MANIFEST_NAME = "manifest.json"
+# One line per asset, small enough for the File Reader to return without summarizing
+DAM_INDEX_NAME = "dam-assets.txt"
+
+_MIME_TYPES = {"avif": "image/avif", "webp": "image/webp", "png": "image/png"}
+
+# The vision API downscales larger images, so bounding boxes would come back
+# in the downscaled coordinates. Images are sent at most this large instead.
+VISION_MAX_EDGE = 1568
+VISION_MAX_PIXELS = 1_150_000
+
+
+def output_formats() -> List[str]:
+    """
+    Formats in order of preference; the last one is the <img> fallback.
+    AVIF + WebP when this Pillow build can encode AVIF, otherwise WebP + PNG.
+    """
+    return ["avif", "webp"] if features.check("avif") else ["webp", "png"]
+
+
+def slugify(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "asset"
+
+
+def vision_scale(size) -> float:
+    """Factor (<= 1) that fits an image of this size within the vision API limits."""
+    width, height = size
+    return min(1.0, VISION_MAX_EDGE / max(width, height), (VISION_MAX_PIXELS / (width * height)) ** 0.5)
+
+
+def scale_regions(regions: List[Dict], factor: float) -> List[Dict]:
+    """Map regions found on a downscaled image back to the original pixels."""
+    scaled = []
+    for region in regions:
+        region = dict(region)
+        for key in ("x", "y", "width", "height"):
+            try:
+                region[key] = round(float(region[key]) / factor)
+            except (KeyError, TypeError, ValueError):
+                pass
+        scaled.append(region)
+    return scaled
+
+
+def clamp_region(region: Dict, size) -> Optional[tuple]:
+    """Convert a region dict (x, y, width, height in pixels) to a crop box inside the image."""
+    img_w, img_h = size
+    try:
+        x, y = int(region["x"]), int(region["y"])
+        w, h = int(region["width"]), int(region["height"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    left, top = max(0, x), max(0, y)
+    right, bottom = min(img_w, x + w), min(img_h, y + h)
+    if right - left < 8 or bottom - top < 8:
+        return None
+    return left, top, right, bottom
+
+
+def _encode(image: Image.Image, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == "webp":
+        image.save(buffer, "WEBP", quality=82, method=6)
+    elif fmt == "avif":
+        image.save(buffer, "AVIF", quality=60)
+    else:
+        image.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def _write(path: str, data: bytes):
+    # Content-hash filenames never change content, so existing files are reused
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _dam_asset_xml(mime_type: str, title: str) -> str:
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<jcr:root xmlns:jcr="http://www.jcp.org/jcr/1.0" xmlns:dam="http://www.day.com/dam/1.0"
+    xmlns:dc="http://purl.org/dc/elements/1.1/"
+    jcr:primaryType="dam:Asset">
+    <jcr:content
+        jcr:primaryType="dam:AssetContent">
+        <metadata
+            dc:format="{mime_type}"
+            dc:title="{html.escape(title)}"
+            jcr:primaryType="nt:unstructured"/>
+        <related jcr:primaryType="nt:unstructured"/>
+    </jcr:content>
+</jcr:root>
+"""
+
+
+def _write_dam_asset(dam_root: str, filename: str, data: bytes, mime_type: str, title: str):
+    """
+    Write one file in FileVault's dam:Asset layout:
+    <filename>/.content.xml and <filename>/_jcr_content/renditions/original
+    """
+    asset_dir = os.path.join(dam_root, filename)
+    renditions = os.path.join(asset_dir, "_jcr_content", "renditions")
+    _write(os.path.join(renditions, "original"), data)
+    _write(os.path.join(renditions, "original.dir", ".content.xml"), f"""<?xml version="1.0" encoding="UTF-8"?>
+<jcr:root xmlns:jcr="http://www.jcp.org/jcr/1.0" xmlns:nt="http://www.jcp.org/jcr/nt/1.0"
+    jcr:primaryType="nt:file">
+    <jcr:content
+        jcr:mimeType="{mime_type}"
+        jcr:primaryType="nt:resource"/>
+</jcr:root>
+""".encode("utf-8"))
+    _write(os.path.join(asset_dir, ".content.xml"), _dam_asset_xml(mime_type, title).encode("utf-8"))
+
+
+def picture_html(variants: List[Dict], base_url: str, alt: str, sizes: str = "100vw") -> str:
+    """<picture> markup with one srcset per format; the last format is the <img> fallback."""
+    by_format: Dict[str, List[Dict]] = {}
+    for variant in variants:
+        by_format.setdefault(variant["format"], []).append(variant)
+
+    def srcset(items):
+        return ", ".join(f"{base_url}/{v['file']} {v['width']}w" for v in items)
+
+    formats = list(by_format)
+    lines = ["<picture>"]
+    for fmt in formats[:-1] if len(formats) > 1 else []:
+        lines.append(f'  <source type="{_MIME_TYPES[fmt]}" srcset="{srcset(by_format[fmt])}" sizes="{sizes}">')
+    fallback = by_format[formats[-1]]
+    largest = max(fallback, key=lambda v: v["width"])
+    lines.append(
+        f'  <img src="{base_url}/{largest["file"]}" srcset="{srcset(fallback)}" sizes="{sizes}" '
+        f'width="{largest["width"]}" height="{largest["height"]}" alt="{alt}" loading="lazy" decoding="async">'
+    )
+    lines.append("</picture>")
+    return "\n".join(lines)
+
+
+def extract_assets(image_path: str, regions: List[Dict], output_folder: str = "output",
+                   aem_project_path: Optional[str] = None, aem_app_id: Optional[str] = None,
+                   widths: Optional[List[int]] = None) -> Dict:
+    """
+    Crop each region out of the design image and write responsive variants
+    with content-hash filenames to {output_folder}/assets and, when an AEM
+    project is given, to its ui.content DAM folder. Returns the manifest.
+    """
+    widths = widths or DEFAULT_WIDTHS
+    formats = output_formats()
+    local_root = os.path.join(output_folder, ASSETS_FOLDER)
+    dam_path = f"/content/dam/{aem_app_id}/design-assets" if aem_app_id else None
+    dam_root = None
+    if aem_project_path and dam_path:
+        dam_root = os.path.join(aem_project_path, "ui.content", "src", "main", "content", "jcr_root",
+                                *dam_path.strip("/").split("/"))
+
+    manifest = {"source": image_path, "formats": formats, "assets": []}
+    with Image.open(image_path) as source:
+        source = source.convert("RGBA") if source.mode in ("P", "LA", "RGBA") else source.convert("RGB")
+        for region in regions:
+            box = clamp_region(region, source.size)
+            if not box:
+                print(f"Skipping region with invalid bounds: {region}")
+                continue
+            crop = source.crop(box)
+            name = slugify(region.get("name", "asset"))
+            digest = hashlib.sha256(crop.tobytes()).hexdigest()[:10]
+
+            variants = []
+            # Skip widths within 10% of the crop itself; the full-size variant covers them
+            targets = sorted({w for w in widths if w < crop.width * 0.9} | {crop.width})
+            for width in targets:
+                height = round(crop.height * width / crop.width)
+                resized = crop if width == crop.width else crop.resize((width, height), Image.LANCZOS)
+                for fmt in formats:
+                    filename = f"{name}.{digest}.{width}w.{fmt}"
+                    local_file = os.path.join(local_root, filename)
+                    dam_original = os.path.join(dam_root, filename, "_jcr_content", "renditions",
+                                                "original") if dam_root else None
+                    if os.path.exists(local_file) and (not dam_original or os.path.exists(dam_original)):
+                        # Already written everywhere; skip the (slow, for AVIF) encode
+                        size = os.path.getsize(local_file)
+                    else:
+                        data = _encode(resized, fmt)
+                        size = len(data)
+                        _write(local_file, data)
+                        if dam_root:
+                            _write_dam_asset(dam_root, filename, data, _MIME_TYPES[fmt], region.get("name", name))
+                    variants.append({"file": filename, "format": fmt, "width": width,
+                                     "height": height, "bytes": size})
+
+            alt = html.escape(region.get("alt", ""))
+            manifest["assets"].append({
+                "name": name,
+                "kind": region.get("kind", "image"),
+                "alt": alt,
+                "box": list(box),
+                "variants": variants,
+                "html": picture_html(variants, ASSETS_FOLDER, alt),
+                "dam_path": f"{dam_path}/{name}.{digest}.{crop.width}w.{formats[-1]}" if dam_root else None,
+                "dam_html": picture_html(variants, dam_path, alt) if dam_root else None,
+            })
+
+    os.makedirs(local_root, exist_ok=True)
+    with open(os.path.join(local_root, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    if dam_root:
+        with open(os.path.join(local_root, DAM_INDEX_NAME), "w", encoding="utf-8") as f:
+            f.write(dam_index(manifest))
+    return manifest
+
+
+def dam_index(manifest: Dict) -> str:
+    """
+    Compact DAM path list: one line per asset with its fallback rendition
+    and the widths/formats of its variants ({dam_path} with the width and
+    format swapped in names the other variants).
+    """
+    lines = ["# name | kind | alt | DAM path | widths | formats"]
+    for asset in manifest["assets"]:
+        widths = ",".join(str(w) for w in sorted({v["width"] for v in asset["variants"]}))
+        lines.append(f"{asset['name']} | {asset['kind']} | {asset['alt'].replace('|', '/')} | {asset['dam_path']} | "
+                     f"{widths} | {','.join(manifest['formats'])}")
+    return "\n".join(lines) + "\n"
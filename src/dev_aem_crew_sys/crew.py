@@ -1,14 +1,21 @@
-from crewai import Agent, Crew, Process, Task, LLM
-from crewai.project import CrewBase, agent, crew, task
+from crewai import Agent, Crew, Process, Task
+from crewai.project import CrewBase, agent, crew, task, before_kickoff, after_kickoff
 from crewai.agents.agent_builder.base_agent import BaseAgent
 from typing import List
+from collections import defaultdict
 from dev_aem_crew_sys.tools.vision_tool import VisionTool
+from dev_aem_crew_sys.tools.asset_extractor_tool import AssetExtractorTool
 from dev_aem_crew_sys.tools.file_writer_tool import FileWriterTool
 from dev_aem_crew_sys.tools.file_reader_tool import FileReaderTool
 from dev_aem_crew_sys.tools.aem_file_writer_tool import AEMFileWriterTool
 from dev_aem_crew_sys.tools.maven_tool import MavenTool
 from dev_aem_crew_sys.tools.user_interaction_tool import UserInteractionTool
-import os
+from dev_aem_crew_sys.tools.compacted_tool import CompactedTool
+from dev_aem_crew_sys.tools.tool_output_tool import ToolOutputTool
+from dev_aem_crew_sys.knowledge_index import KnowledgeIndex, format_chunks
+from dev_aem_crew_sys.pipeline import ComponentPipeline, ComponentRun, ProjectLock, parse_component_list
+from dev_aem_crew_sys.routing import ModelRouter
+from dev_aem_crew_sys.scratchpad import Scratchpad
 # If you want to run a snippet of code before or after the crew starts,
 # you can use the @before_kickoff and @after_kickoff decorators
 # https://docs.crewai.com/concepts/crews#example-crew-class-with-decorators
@@ -24,30 +31,94 @@ class DevAemCrewSys():
     # Agents: https://docs.crewai.com/concepts/agents#yaml-configuration-recommended
     # Tasks: https://docs.crewai.com/concepts/tasks#yaml-configuration-recommended
     
+    @property
+    def router(self) -> ModelRouter:
+        """Per-run model router built from agents.yaml and tasks.yaml"""
+        if not hasattr(self, '_router'):
+            self._router = ModelRouter(self.agents_config, self.tasks_config)
+        return self._router
+
+    @property
+    def scratchpad(self) -> Scratchpad:
+        """Out-of-band store for full tool outputs, shared by all agents in the run"""
+        if not hasattr(self, '_scratchpad'):
+            self._scratchpad = Scratchpad()
+        return self._scratchpad
+
+    @property
+    def maven_tool(self) -> MavenTool:
+        """Maven tool shared by the AEM agent; the pipeline reads its build results"""
+        if not hasattr(self, '_maven_tool'):
+            self._maven_tool = MavenTool()
+        return self._maven_tool
+
+    def _routed(self, task_name: str) -> dict:
+        """
+        Gives a task its own copy of its agent running on the task's routed
+        LLM and with its own compaction scope, plus the guardrail that
+        escalates to the fallback model.
+        """
+        task_config = self.tasks_config[task_name]
+        agent = task_config['agent'].copy()
+        agent.llm = self.router.task_llm(task_name, agent_llm=task_config['agent'].llm)
+        # Repeat-call diffs only make sense for outputs this task run has seen
+        agent.tools = [
+            t.scoped(task_name) if isinstance(t, CompactedTool) else t for t in agent.tools or []
+        ]
+        routed = {'agent': agent}
+        guardrail = self.router.guardrail(task_name, agent.llm)
+        if guardrail:
+            routed['guardrail'] = guardrail
+        return routed
+
+    @after_kickoff
+    def write_routing_log(self, result):
+        """Record observed latency and tokens per model route"""
+        self.router.write_log()
+        return result
+
+    @before_kickoff
+    def inject_knowledge(self, inputs):
+        """
+        Retrieve the top-k knowledge base chunks for every task that declares a
+        knowledge_query and expose them as the {<task_name>_knowledge} input.
+        The index is cached and only rebuilt when a source document changes.
+        """
+        inputs = dict(inputs or {})
+        index = KnowledgeIndex.load_or_build('.')
+        for task_name, task_config in self.tasks_config.items():
+            query = task_config.get('knowledge_query')
+            if not query:
+                continue
+            query = query.format_map(defaultdict(str, inputs))
+            chunks = index.search(
+                query,
+                top_k=task_config.get('knowledge_top_k', 4),
+                token_budget=task_config.get('knowledge_token_budget', 1200)
+            )
+            inputs[f'{task_name}_knowledge'] = format_chunks(chunks)
+        return inputs
+
     # If you would like to add tools to your agents, you can learn more about it here:
     # https://docs.crewai.com/concepts/agents#agent-tools
     @agent
     def webdesigner(self) -> Agent:
-        # Create LLM instance for Claude
-        llm = LLM(
-            model="anthropic/claude-3-5-sonnet-20241022",
-            api_key=os.getenv("ANTHROPIC_API_KEY")
-        )
+        llm = self.router.agent_llm('webdesigner')
 
         return Agent(
             config=self.agents_config['webdesigner'], # type: ignore[index]
             verbose=True,
-            tools=[VisionTool()],
+            tools=[
+                CompactedTool(VisionTool(model=self.router.tool_model('webdesigner', 'vision'), router=self.router), self.scratchpad),
+                AssetExtractorTool(model=self.router.tool_model('webdesigner', 'assets'), router=self.router),
+                ToolOutputTool(scratchpad=self.scratchpad)
+            ],
             llm=llm
         )
 
     @agent
     def component_developer(self) -> Agent:
-        # Create LLM instance for Claude
-        llm = LLM(
-            model="anthropic/claude-3-5-sonnet-20241022",
-            api_key=os.getenv("ANTHROPIC_API_KEY")
-        )
+        llm = self.router.agent_llm('component_developer')
 
         return Agent(
             config=self.agents_config['component_developer'], # type: ignore[index]
@@ -58,16 +129,18 @@ class DevAemCrewSys():
 
     @agent
     def aem_developer(self) -> Agent:
-        # Create LLM instance for Claude
-        llm = LLM(
-            model="anthropic/claude-3-5-sonnet-20241022",
-            api_key=os.getenv("ANTHROPIC_API_KEY")
-        )
+        llm = self.router.agent_llm('aem_developer')
 
         return Agent(
             config=self.agents_config['aem_developer'], # type: ignore[index]
             verbose=True,
-            tools=[FileReaderTool(), AEMFileWriterTool(), MavenTool(), UserInteractionTool()],
+            tools=[
+                CompactedTool(FileReaderTool(), self.scratchpad),
+                AEMFileWriterTool(),
+                CompactedTool(self.maven_tool, self.scratchpad),
+                UserInteractionTool(),
+                ToolOutputTool(scratchpad=self.scratchpad)
+            ],
             llm=llm
         )
 
@@ -78,13 +151,23 @@ class DevAemCrewSys():
     def design_analysis_task(self) -> Task:
         return Task(
             config=self.tasks_config['design_analysis_task'], # type: ignore[index]
+            **self._routed('design_analysis_task'),
             output_file='design_analysis.txt'
         )
 
+    @task
+    def design_asset_task(self) -> Task:
+        return Task(
+            config=self.tasks_config['design_asset_task'], # type: ignore[index]
+            **self._routed('design_asset_task'),
+            output_file='design_assets.txt'
+        )
+
     @task
     def component_listing_task(self) -> Task:
         return Task(
             config=self.tasks_config['component_listing_task'], # type: ignore[index]
+            **self._routed('component_listing_task'),
             output_file='component_list.txt'
         )
 
@@ -92,6 +175,7 @@ class DevAemCrewSys():
     def component_creation_task(self) -> Task:
         return Task(
             config=self.tasks_config['component_creation_task'], # type: ignore[index]
+            **self._routed('component_creation_task'),
             output_file='component_summary.txt'
         )
 
@@ -99,6 +183,7 @@ class DevAemCrewSys():
     def aem_component_list_task(self) -> Task:
         return Task(
             config=self.tasks_config['aem_component_list_task'], # type: ignore[index]
+            **self._routed('aem_component_list_task'),
             output_file='aem_component_selection.txt'
         )
 
@@ -106,6 +191,7 @@ class DevAemCrewSys():
     def aem_component_conversion_task(self) -> Task:
         return Task(
             config=self.tasks_config['aem_component_conversion_task'], # type: ignore[index]
+            **self._routed('aem_component_conversion_task'),
             output_file='aem_component_files.txt'
         )
 
@@ -113,6 +199,7 @@ class DevAemCrewSys():
     def aem_build_deploy_task(self) -> Task:
         return Task(
             config=self.tasks_config['aem_build_deploy_task'], # type: ignore[index]
+            **self._routed('aem_build_deploy_task'),
             output_file='aem_build_log.txt'
         )
 
@@ -120,6 +207,7 @@ class DevAemCrewSys():
     def aem_testing_task(self) -> Task:
         return Task(
             config=self.tasks_config['aem_testing_task'], # type: ignore[index]
+            **self._routed('aem_testing_task'),
             output_file='aem_testing_report.txt'
         )
 
@@ -129,21 +217,103 @@ class DevAemCrewSys():
         # To learn how to add knowledge sources to your crew, check out the documentation:
         # https://docs.crewai.com/concepts/knowledge#what-is-knowledge
 
+        tasks = [
+            # First phase: Design analysis and HTML component creation
+            self.design_analysis_task(),
+            self.design_asset_task(),
+            self.component_listing_task(),
+            self.component_creation_task(),
+            # Second phase: AEM conversion and deployment
+            self.aem_component_list_task(),
+            self.aem_component_conversion_task(),
+            self.aem_build_deploy_task(),
+            self.aem_testing_task()
+        ]
+
+        # Each task runs on its own routed copy of its agent; the crew only wires
+        # up (crew reference, memory, knowledge, callbacks) the agents it lists
         return Crew(
-            agents=[self.webdesigner(), self.component_developer(), self.aem_developer()],
-            tasks=[
-                # First phase: Design analysis and HTML component creation
-                self.design_analysis_task(),
-                self.component_listing_task(),
-                self.component_creation_task(),
-                # Second phase: AEM conversion and deployment
-                self.aem_component_list_task(),
-                self.aem_component_conversion_task(),
-                self.aem_build_deploy_task(),
-                self.aem_testing_task()
-            ],
+            agents=[t.agent for t in tasks],
+            tasks=tasks,
             process=Process.sequential,
             verbose=True,
         )
 
-    
+    def planning_crew(self) -> Crew:
+        """Creates the design analysis, asset export and component listing crew that feeds the pipeline"""
+        tasks = [self.design_analysis_task(), self.design_asset_task(), self.component_listing_task()]
+        return Crew(
+            agents=[t.agent for t in tasks],
+            tasks=tasks,
+            process=Process.sequential,
+            verbose=True,
+        )
+
+    def stage_crew(self, task_name: str) -> Crew:
+        """
+        Creates a single-task crew for one pipeline stage.
+        Uses a fresh Task and a copy of its agent so stages for different
+        components can run at the same time.
+        """
+        task_config = dict(self.tasks_config[task_name])
+        routed = self._routed(task_name)
+        task = Task(config=task_config, context=[], **routed)
+
+        return Crew(
+            agents=[task.agent],
+            tasks=[task],
+            process=Process.sequential,
+            verbose=True,
+        )
+
+    def _run_stage(self, task_name: str, inputs: dict) -> str:
+        if task_name == 'aem_build_deploy_task':
+            # Drop a result left on this worker thread by an earlier stage
+            self.maven_tool.pop_result()
+        return self.stage_crew(task_name).kickoff(inputs=inputs).raw
+
+    def _stage_failed(self, task_name: str, output: str) -> bool:
+        """A build stage fails on the Maven tool's own result, not the agent's report"""
+        if task_name != 'aem_build_deploy_task':
+            return False
+        return not MavenTool.succeeded(self.maven_tool.pop_result())
+
+    def kickoff_pipeline(self, inputs) -> List[ComponentRun]:
+        """
+        Runs the crew in pipelined mode: after the shared design analysis and
+        component listing, each component moves through HTML creation, AEM
+        conversion and the Maven build as soon as its previous step finishes.
+        """
+        planning = self.planning_crew().kickoff(inputs=inputs)
+        design_analysis = planning.tasks_output[0].raw
+        design_assets = planning.tasks_output[1].raw
+
+        components = parse_component_list(planning.raw)
+        if not components:
+            raise ValueError(
+                "The component listing returned no components in the '1. name - description' format; "
+                "nothing to run through the pipeline"
+            )
+
+        runs = []
+        for name, spec in components:
+            component_inputs = dict(
+                inputs,
+                component_name=name,
+                selected_component=name,
+                component_spec=spec,
+                design_analysis=design_analysis,
+                design_assets=design_assets
+            )
+            runs.append(ComponentRun(name, self.inject_knowledge(component_inputs)))
+
+        # Conversions share the AEM project; the Maven tool takes it exclusively per build
+        project_lock = ProjectLock()
+        self.maven_tool.project_lock = project_lock
+        pipeline = ComponentPipeline(run_stage=self._run_stage, is_failure=self._stage_failed,
+                                     project_lock=project_lock)
+        try:
+            return pipeline.run(runs)
+        finally:
+            self.maven_tool.project_lock = None
+            self.router.write_log()
@@ -0,0 +1,280 @@
+import hashlib
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+
+
+# Documents the AEM guidance is retrieved from, relative to the project root.
+# Directories are walked for .md and .txt files. Docs about this crew itself
+# (USAGE.md, AEM_AGENT_SETUP.md) are left out: they only repeat the task text.
+DEFAULT_SOURCES = [
+    "aem-agent-prompt.md",
+    "knowledge",
+]
+DEFAULT_CACHE_PATH = ".knowledge_index.json"
+INDEX_VERSION = 3
+
+# Chunks are split on markdown headings and then capped at this many estimated
+# tokens, so every chunk fits in the smallest per-task retrieval budget
+MAX_CHUNK_TOKENS = 300
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "if", "in",
+    "into", "is", "it", "its", "of", "on", "or", "that", "the", "this", "to",
+    "use", "with", "you", "your", "will", "should", "must", "all", "each",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*)$")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords removed."""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token estimate (~4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+def _cache_key() -> str:
+    """Changes whenever the index format or the chunking parameters change."""
+    return f"v{INDEX_VERSION}-max{MAX_CHUNK_TOKENS}"
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(65536), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _collect_files(root: str, sources: List[str]) -> List[str]:
+    """Resolve the source list into relative file paths that exist on disk."""
+    files = []
+    for source in sources:
+        full = os.path.join(root, source)
+        if os.path.isfile(full):
+            files.append(source)
+        elif os.path.isdir(full):
+            for dirpath, _, filenames in os.walk(full):
+                for name in sorted(filenames):
+                    if name.lower().endswith((".md", ".txt")):
+                        files.append(os.path.relpath(os.path.join(dirpath, name), root))
+    return sorted(set(files))
+
+
+def _hard_split(paragraph: str, max_tokens: int) -> List[str]:
+    """
+    Split an oversized paragraph or code block at line boundaries (and long
+    lines at character boundaries). A code fence that is open at a split is
+    closed and re-opened, so every piece renders as valid markdown.
+    """
+    limit = max_tokens * 4
+    lines: List[str] = []
+    for line in paragraph.splitlines():
+        lines.extend([line[i:i + limit // 2] for i in range(0, len(line), limit // 2)] or [""])
+
+    pieces: List[str] = []
+    current: List[str] = []
+    size = 0
+    fence: Optional[str] = None
+    for line in lines:
+        # Leave room for closing and re-opening the fence around the split
+        reserve = len(fence) + 5 if fence else 0
+        if current and size + len(line) + 1 + reserve > limit:
+            pieces.append("\n".join(current + (["```"] if fence else [])))
+            current = [fence] if fence else []
+            size = len(fence) + 1 if fence else 0
+        current.append(line)
+        size += len(line) + 1
+        if line.strip().startswith("```"):
+            fence = None if fence else line.strip()
+    if current:
+        pieces.append("\n".join(current))
+    return pieces
+
+
+def _blocks(text: str) -> List[str]:
+    """Paragraphs separated by blank lines; a fenced code block is one paragraph."""
+    blocks: List[str] = []
+    current: List[str] = []
+    in_code = False
+    for line in text.splitlines():
+        if line.strip().startswith("```"):
+            in_code = not in_code
+        if not line.strip() and not in_code:
+            if current:
+                blocks.append("\n".join(current))
+                current = []
+            continue
+        current.append(line)
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def _split_tokens(text: str, max_tokens: int) -> List[str]:
+    """Split a section into paragraph-aligned pieces of at most max_tokens."""
+    pieces: List[str] = []
+    current: List[str] = []
+    count = 0
+    for paragraph in _blocks(text):
+        tokens = estimate_tokens(paragraph)
+        if current and count + tokens > max_tokens:
+            pieces.append("\n\n".join(current))
+            current, count = [], 0
+        if tokens > max_tokens:
+            pieces.extend(_hard_split(paragraph, max_tokens))
+            continue
+        current.append(paragraph)
+        count += tokens + 1
+    if current:
+        pieces.append("\n\n".join(current))
+    return [p.strip() for p in pieces if p.strip()]
+
+
+def chunk_document(source: str, text: str, max_tokens: int = MAX_CHUNK_TOKENS) -> List[Dict]:
+    """
+    Split a document into chunks on markdown headings.
+    Each chunk keeps its heading trail so it reads on its own in a prompt.
+    """
+    chunks = []
+    trail: List[str] = []
+    body: List[str] = []
+
+    def flush():
+        section = "\n".join(body).strip()
+        if not section:
+            return
+        heading = " > ".join(trail)
+        for piece in _split_tokens(section, max_tokens):
+            chunks.append({"source": source, "heading": heading, "text": piece})
+
+    in_code = False
+    for line in text.splitlines():
+        if line.strip().startswith("```"):
+            in_code = not in_code
+        match = None if in_code else _HEADING_RE.match(line)
+        if match:
+            flush()
+            body = []
+            level = len(match.group(1))
+            trail = trail[:level - 1] + [match.group(2).strip()]
+        else:
+            body.append(line)
+    flush()
+    return chunks
+
+
+class KnowledgeIndex:
+    """
+    BM25 index over the local AEM knowledge documents.
+    The index is cached on disk and only rebuilt when a source file hash changes.
+    """
+
+    def __init__(self, chunks: List[Dict], file_hashes: Dict[str, str], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.file_hashes = file_hashes
+        self.k1 = k1
+        self.b = b
+        self._term_freqs = [Counter(tokenize(c["heading"] + "\n" + c["text"])) for c in chunks]
+        self._lengths = [sum(tf.values()) for tf in self._term_freqs]
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        doc_freq: Counter = Counter()
+        for tf in self._term_freqs:
+            doc_freq.update(tf.keys())
+        total = len(chunks)
+        self._idf = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+    @classmethod
+    def build(cls, root: str, sources: Optional[List[str]] = None) -> "KnowledgeIndex":
+        chunks, hashes = [], {}
+        for rel in _collect_files(root, sources or DEFAULT_SOURCES):
+            full = os.path.join(root, rel)
+            hashes[rel] = _file_hash(full)
+            with open(full, "r", encoding="utf-8", errors="replace") as f:
+                chunks.extend(chunk_document(rel, f.read()))
+        return cls(chunks, hashes)
+
+    @classmethod
+    def load_or_build(cls, root: str = ".", sources: Optional[List[str]] = None,
+                      cache_path: str = DEFAULT_CACHE_PATH) -> "KnowledgeIndex":
+        """
+        Load the cached index if every source file hash still matches,
+        otherwise rebuild it and rewrite the cache.
+        """
+        sources = sources or DEFAULT_SOURCES
+        cache_file = os.path.join(root, cache_path)
+        current = {rel: _file_hash(os.path.join(root, rel)) for rel in _collect_files(root, sources)}
+
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, "r", encoding="utf-8") as f:
+                    cached = json.load(f)
+                if cached.get("key") == _cache_key() and cached.get("files") == current:
+                    return cls(cached["chunks"], cached["files"])
+            except (OSError, ValueError, KeyError):
+                pass
+
+        index = cls.build(root, sources)
+        try:
+            with open(cache_file, "w", encoding="utf-8") as f:
+                json.dump({"key": _cache_key(), "files": index.file_hashes, "chunks": index.chunks}, f)
+        except OSError as e:
+            print(f"Warning: could not write knowledge index cache {cache_file}: {e}")
+        return index
+
+    def score(self, query: str) -> List[float]:
+        terms = tokenize(query)
+        scores = []
+        for tf, length in zip(self._term_freqs, self._lengths):
+            s = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / self._avg_length) if self._avg_length else self.k1
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    s += self._idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            scores.append(s)
+        return scores
+
+    def search(self, query: str, top_k: int = 5, token_budget: int = 1500) -> List[Dict]:
+        """
+        Return up to top_k chunks ranked by BM25, stopping before the
+        combined chunk size would exceed token_budget.
+        """
+        ranked = sorted(
+            ((s, i) for i, s in enumerate(self.score(query)) if s > 0),
+            key=lambda pair: pair[0],
+            reverse=True,
+        )
+        results, used = [], 0
+        for s, i in ranked:
+            if len(results) >= top_k:
+                break
+            chunk = self.chunks[i]
+            cost = estimate_tokens(chunk["text"])
+            if used + cost > token_budget:
+                continue
+            used += cost
+            results.append(dict(chunk, score=round(s, 3)))
+        return results
+
+
+def format_chunks(chunks: List[Dict]) -> str:
+    """Render retrieved chunks as a prompt section."""
+    if not chunks:
+        return "No additional guidance found in the knowledge base."
+    parts = []
+    for chunk in chunks:
+        title = f"{chunk['source']} - {chunk['heading']}" if chunk["heading"] else chunk["source"]
+        parts.append(f"[{title}]\n{chunk['text']}")
+    return "\n\n---\n\n".join(parts)
@@ -58,6 +58,52 @@ def run():
 # Removed run_aem as it's now integrated into the main run function
 
 
+def run_pipeline():
+    """
+    Run the crew in pipelined mode: every component moves through HTML creation,
+    AEM conversion and the Maven build independently of the others.
+    """
+    inputs = {
+        'design_path': './design.png',
+        'output_folder': './output',
+        'aem_project_path': r'C:\Dev\AEM-projects\dev-aem-crew\hackaempoc',
+        'aem_app_id': 'hackaempoc',
+        'aem_component_group': 'Hack AEM POC',
+        'aem_namespace': 'hack/aem/poc'
+    }
+
+    try:
+        runs = DevAemCrewSys().kickoff_pipeline(inputs=inputs)
+    except Exception as e:
+        raise Exception(f"An error occurred while running the pipeline: {e}")
+
+    failed = [r.name for r in runs if r.failed]
+    if failed:
+        raise Exception(f"Pipeline finished with failed components: {', '.join(failed)}")
+
+
+def watch():
+    """
+    Watch the AEM project's ui.apps tree and sync every change into the running
+    AEM instance. Core Java changes fall back to a full Maven build.
+    Optional argument: the AEM project path.
+    """
+    from dev_aem_crew_sys.sync import AemSync
+    from dev_aem_crew_sys.tools.maven_tool import MavenTool
+
+    aem_project_path = sys.argv[1] if len(sys.argv) > 1 else r'C:\Dev\AEM-projects\dev-aem-crew\hackaempoc'
+
+    try:
+        AemSync(
+            aem_project_path,
+            full_build=lambda: MavenTool()._run(aem_project_path=aem_project_path)
+        ).watch()
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        raise Exception(f"An error occurred while watching the AEM project: {e}")
+
+
 def train():
     """
     Train the crew for a given number of iterations.
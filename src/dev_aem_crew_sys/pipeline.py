@@ -0,0 +1,219 @@
+import queue
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# Per-component stages, in order, with the number of concurrent workers each.
+# The Maven build runs against a single AEM project, so it stays serial.
+DEFAULT_STAGES: List[Tuple[str, int]] = [
+    ("component_html_task", 2),
+    ("aem_component_conversion_task", 2),
+    ("aem_build_deploy_task", 1),
+]
+
+# How each stage uses the shared AEM project. Conversions of different
+# components write into it side by side. Builds are not listed: the Maven
+# tool takes the lock exclusively around the Maven run only, so a build
+# never compiles another component's half-written files but the build
+# agent's LLM turns do not hold up conversions.
+PROJECT_ACCESS: Dict[str, str] = {
+    "aem_component_conversion_task": "shared",
+}
+
+_ITEM_RE = re.compile(r"^\s*\d+\.\s+([a-z0-9][a-z0-9-]*)\s+-\s+(.*)$", re.IGNORECASE)
+
+
+def parse_component_list(text: str) -> List[Tuple[str, str]]:
+    """
+    Parse the component_listing_task output into (name, spec) pairs.
+    Continuation lines belong to the preceding numbered item.
+    """
+    components: List[Tuple[str, List[str]]] = []
+    for line in text.splitlines():
+        match = _ITEM_RE.match(line)
+        if match:
+            components.append((match.group(1).lower(), [match.group(2).strip()]))
+        elif not components or not line.strip():
+            continue
+        elif line.startswith((" ", "\t")):
+            components[-1][1].append(line.strip())
+        else:
+            # Free text after the list ends the current item
+            components.append(("", []))
+    return [(name, "\n".join(spec)) for name, spec in components if name]
+
+
+class ProjectLock:
+    """
+    Shared/exclusive lock over the AEM project tree. A waiting exclusive
+    holder blocks new shared holders, so builds are not starved by a
+    steady stream of conversions.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._shared = 0
+        self._exclusive = False
+        self._waiting = 0
+        self._held = threading.local()
+
+    @contextmanager
+    def shared(self):
+        with self._cond:
+            self._cond.wait_for(lambda: not self._exclusive and not self._waiting)
+            self._shared += 1
+        self._held.shared = getattr(self._held, "shared", 0) + 1
+        try:
+            yield
+        finally:
+            self._held.shared -= 1
+            with self._cond:
+                self._shared -= 1
+                self._cond.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        if getattr(self._held, "shared", 0):
+            # Waiting here would wait on ourselves (e.g. a build during a conversion)
+            raise RuntimeError("the AEM project is locked for a conversion on this thread; build in the build stage")
+        with self._cond:
+            self._waiting += 1
+            self._cond.wait_for(lambda: not self._exclusive and not self._shared)
+            self._waiting -= 1
+            self._exclusive = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._exclusive = False
+                self._cond.notify_all()
+
+    @contextmanager
+    def hold(self, access: Optional[str]):
+        """Hold the lock in the given mode ('shared', 'exclusive' or None)."""
+        if access == "exclusive":
+            with self.exclusive():
+                yield
+        elif access == "shared":
+            with self.shared():
+                yield
+        else:
+            yield
+
+
+@dataclass
+class StageResult:
+    """Outcome and timing of one stage for one component."""
+    stage: str
+    started: float
+    finished: float
+    output: str = ""
+    error: Optional[str] = None
+
+    @property
+    def seconds(self) -> float:
+        return self.finished - self.started
+
+
+@dataclass
+class ComponentRun:
+    """A component moving through the pipeline."""
+    name: str
+    inputs: Dict
+    results: List[StageResult] = field(default_factory=list)
+    failed: bool = False
+
+
+class ComponentPipeline:
+    """
+    Streaming producer/consumer pipeline over components.
+
+    Every stage has its own queue and worker threads. A component is handed
+    to the next stage as soon as its current stage finishes, so HTML
+    generation for one component overlaps with AEM conversion and builds
+    for others. Stages listed in project_access hold the project lock while
+    they run.
+    """
+
+    def __init__(self, run_stage: Callable[[str, Dict], str],
+                 stages: Optional[List[Tuple[str, int]]] = None,
+                 is_failure: Optional[Callable[[str, str], bool]] = None,
+                 project_access: Optional[Dict[str, str]] = None,
+                 project_lock: Optional[ProjectLock] = None):
+        self.run_stage = run_stage
+        self.stages = stages or DEFAULT_STAGES
+        self.is_failure = is_failure or (lambda stage, output: False)
+        self.project_access = PROJECT_ACCESS if project_access is None else project_access
+        self.project_lock = project_lock or ProjectLock()
+        self._queues = [queue.Queue() for _ in self.stages]
+        self._lock = threading.Lock()
+        self._done: List[ComponentRun] = []
+
+    def _worker(self, index: int):
+        stage, _ = self.stages[index]
+        while True:
+            item = self._queues[index].get()
+            if item is None:
+                self._queues[index].task_done()
+                return
+            started = time.perf_counter()
+            try:
+                with self.project_lock.hold(self.project_access.get(stage)):
+                    # Time spent waiting for the project is not stage time
+                    started = time.perf_counter()
+                    output = str(self.run_stage(stage, item.inputs))
+                error = f"{stage} reported a failure" if self.is_failure(stage, output) else None
+            except Exception as e:
+                output, error = "", f"{stage} raised: {e}"
+            item.results.append(StageResult(stage, started, time.perf_counter(), output, error))
+            print(f"[pipeline] {item.name}: {stage} {'FAILED' if error else 'done'} "
+                  f"in {item.results[-1].seconds:.1f}s")
+
+            if error:
+                item.failed = True
+            if error or index == len(self.stages) - 1:
+                with self._lock:
+                    self._done.append(item)
+            else:
+                self._queues[index + 1].put(item)
+            self._queues[index].task_done()
+
+    def run(self, components: List[ComponentRun]) -> List[ComponentRun]:
+        """Push every component through all stages and wait for completion."""
+        threads = []
+        for index, (_, workers) in enumerate(self.stages):
+            for _ in range(max(1, workers)):
+                thread = threading.Thread(target=self._worker, args=(index,), daemon=True)
+                thread.start()
+                threads.append((index, thread))
+
+        start = time.perf_counter()
+        for component in components:
+            self._queues[0].put(component)
+
+        # Drain stage by stage: once stage N is idle nothing new can reach N+1
+        for index, (_, workers) in enumerate(self.stages):
+            self._queues[index].join()
+            for _ in range(max(1, workers)):
+                self._queues[index].put(None)
+        for _, thread in threads:
+            thread.join()
+
+        print(self.summary(time.perf_counter() - start))
+        return self._done
+
+    def summary(self, wall_seconds: float) -> str:
+        lines = ["", "PIPELINE SUMMARY", "-" * 50]
+        serial = 0.0
+        for run in sorted(self._done, key=lambda r: r.name):
+            total = sum(r.seconds for r in run.results)
+            serial += total
+            status = "FAILED" if run.failed else "OK"
+            stages = ", ".join(f"{r.stage}={r.seconds:.1f}s" for r in run.results)
+            lines.append(f"{run.name}: {status} ({total:.1f}s) {stages}")
+        lines.append(f"Wall clock: {wall_seconds:.1f}s (sum of stage time: {serial:.1f}s)")
+        return "\n".join(lines)
@@ -0,0 +1,257 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from crewai import LLM
+from crewai.llms.base_llm import BaseLLM
+from crewai.types.usage_metrics import UsageMetrics
+
+from dev_aem_crew_sys.pipeline import parse_component_list
+
+
+DEFAULT_MODEL = "anthropic/claude-3-5-sonnet-20241022"
+ROUTING_LOG = "model_routing_log.json"
+
+
+class BudgetExceededError(RuntimeError):
+    """Raised when a run goes over its token or latency budget."""
+
+
+# Output checks that can be named in tasks.yaml as `output_validator`.
+# A failed check escalates the task to its `fallback_model`.
+VALIDATORS: Dict[str, Callable[[str], bool]] = {
+    "non_empty": lambda raw: bool(raw and raw.strip()),
+    "component_list": lambda raw: len(parse_component_list(raw or "")) > 0,
+}
+
+
+def _env_number(name: str) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+class RunBudget:
+    """Per-run token and wall-clock budget shared by every route."""
+
+    def __init__(self, max_tokens: Optional[float] = None, max_seconds: Optional[float] = None):
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self.tokens = 0
+        self.started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RunBudget":
+        """Reads CREW_MAX_TOKENS and CREW_MAX_SECONDS; unset means unlimited."""
+        return cls(_env_number("CREW_MAX_TOKENS"), _env_number("CREW_MAX_SECONDS"))
+
+    def check(self, route: str):
+        with self._lock:
+            if self.started is None:
+                self.started = time.perf_counter()
+            elapsed = time.perf_counter() - self.started
+            if self.max_tokens is not None and self.tokens >= self.max_tokens:
+                raise BudgetExceededError(
+                    f"Token budget exceeded before '{route}': {self.tokens} of {int(self.max_tokens)} used"
+                )
+            if self.max_seconds is not None and elapsed >= self.max_seconds:
+                raise BudgetExceededError(
+                    f"Latency budget exceeded before '{route}': {elapsed:.0f}s of {self.max_seconds:.0f}s used"
+                )
+
+    def spend(self, tokens: int):
+        with self._lock:
+            self.tokens += tokens
+
+
+class RoutedLLM(BaseLLM):
+    """
+    LLM wrapper for one route (a task, agent or tool).
+    Enforces the run budget before each call and records latency and tokens
+    afterwards. Calling escalate() switches to the fallback model.
+    """
+
+    def __init__(self, router: "ModelRouter", route: str, model: str, fallback_model: Optional[str] = None):
+        self.router = router
+        self.route = route
+        self.fallback_model = fallback_model
+        self.inner = router.create_llm(model)
+        # Inner LLMs replaced by escalate(); their usage still counts
+        self.retired: List[BaseLLM] = []
+        super().__init__(model=model)
+
+    @property
+    def stop(self) -> List[str]:
+        return getattr(self.inner, "stop", None) or []
+
+    @stop.setter
+    def stop(self, value):
+        # The agent executor sets stop words on the LLM it was given
+        if hasattr(self, "inner"):
+            self.inner.stop = value
+
+    def escalate(self) -> bool:
+        """Switch to the fallback model. Returns False if there is none left."""
+        if not self.fallback_model or self.fallback_model == self.model:
+            return False
+        print(f"[routing] {self.route}: escalating {self.model} -> {self.fallback_model}")
+        stop = self.stop
+        self.model = self.fallback_model
+        self.retired.append(self.inner)
+        self.inner = self.router.create_llm(self.model)
+        self.inner.stop = stop
+        self.fallback_model = None
+        return True
+
+    def _used_tokens(self) -> Optional[int]:
+        try:
+            return int(self.inner.get_token_usage_summary().total_tokens)
+        except Exception:
+            return None
+
+    def call(self, messages, *args, **kwargs):
+        self.router.budget.check(self.route)
+        # Context size of this turn, including every tool result so far
+        context_tokens = len(str(messages)) // 4
+        before = self._used_tokens()
+        started = time.perf_counter()
+        response = self.inner.call(messages, *args, **kwargs)
+        seconds = time.perf_counter() - started
+
+        after = self._used_tokens()
+        if before is not None and after is not None and after > before:
+            tokens = after - before
+        else:
+            # Provider does not expose usage: estimate ~4 characters per token
+            tokens = (len(str(messages)) + len(str(response))) // 4
+        self.router.record(self.route, self.model, seconds, tokens, context_tokens)
+        return response
+
+    def get_token_usage_summary(self) -> UsageMetrics:
+        """
+        Usage of the current inner LLM plus every one replaced by escalate(),
+        so crewAI's crew usage metrics include routed calls.
+        """
+        summary = UsageMetrics()
+        for llm in self.retired + [self.inner]:
+            summary.add_usage_metrics(llm.get_token_usage_summary())
+        return summary
+
+    def supports_function_calling(self) -> bool:
+        return self.inner.supports_function_calling()
+
+    def supports_stop_words(self) -> bool:
+        return self.inner.supports_stop_words()
+
+    def get_context_window_size(self) -> int:
+        return self.inner.get_context_window_size()
+
+
+class ModelRouter:
+    """
+    Picks a model per agent, task or tool from agents.yaml / tasks.yaml
+    (`model`, `fallback_model`, `output_validator`, `tool_models`) and
+    records the observed latency per route.
+    """
+
+    def __init__(self, agents_config: Dict, tasks_config: Dict, budget: Optional[RunBudget] = None,
+                 log_path: str = ROUTING_LOG):
+        self.agents_config = agents_config
+        self.tasks_config = tasks_config
+        self.budget = budget or RunBudget.from_env()
+        self.log_path = log_path
+        self.calls: Dict[str, List[Dict]] = {}
+        self._lock = threading.Lock()
+
+    def create_llm(self, model: str) -> LLM:
+        return LLM(model=model, api_key=os.getenv("ANTHROPIC_API_KEY"))
+
+    def agent_llm(self, agent_name: str) -> RoutedLLM:
+        """Default LLM for an agent, used when a task has no route of its own."""
+        config = self.agents_config.get(agent_name, {})
+        return RoutedLLM(self, agent_name, config.get("model", DEFAULT_MODEL), config.get("fallback_model"))
+
+    def task_llm(self, task_name: str, agent_llm: RoutedLLM) -> RoutedLLM:
+        """LLM for one task: the task's own route, else its agent's."""
+        task_config = self.tasks_config.get(task_name, {})
+        model = task_config.get("model") or agent_llm.model
+        fallback = task_config.get("fallback_model") or agent_llm.fallback_model
+        return RoutedLLM(self, task_name, model, fallback)
+
+    def tool_model(self, agent_name: str, tool: str) -> str:
+        """Model string for a tool that calls the provider SDK directly."""
+        tool_models = self.agents_config.get(agent_name, {}).get("tool_models") or {}
+        model = tool_models.get(tool) or self.agents_config.get(agent_name, {}).get("model", DEFAULT_MODEL)
+        return model.split("/", 1)[1] if model.startswith("anthropic/") else model
+
+    @contextmanager
+    def track(self, route: str, model: str) -> Iterator[Dict[str, int]]:
+        """
+        Budget check and latency record around a direct provider SDK call
+        from a tool. Set usage["tokens"] inside the block. Failed calls are
+        recorded too, since their latency still counts for the route.
+        """
+        self.budget.check(route)
+        usage = {"tokens": 0}
+        started = time.perf_counter()
+        try:
+            yield usage
+        finally:
+            self.record(route, model, time.perf_counter() - started, usage["tokens"])
+
+    def guardrail(self, task_name: str, llm: RoutedLLM) -> Optional[Callable[[Any], Tuple[bool, Any]]]:
+        """
+        Task guardrail for the configured output_validator. On failure the
+        task's LLM escalates to its fallback model before crewAI retries.
+        """
+        name = self.tasks_config.get(task_name, {}).get("output_validator")
+        if not name:
+            return None
+        validator = VALIDATORS[name]
+
+        def check(output) -> Tuple[bool, Any]:
+            if validator(output.raw):
+                return True, output
+            escalated = llm.escalate()
+            reason = f"Output failed the '{name}' check for {task_name}."
+            if escalated:
+                reason += f" Retrying with {llm.model}."
+            return False, reason
+
+        return check
+
+    def record(self, route: str, model: str, seconds: float, tokens: int, context_tokens: Optional[int] = None):
+        self.budget.spend(tokens)
+        with self._lock:
+            calls = self.calls.setdefault(route, [])
+            calls.append({"model": model, "seconds": round(seconds, 3), "tokens": tokens,
+                          "context_tokens": context_tokens})
+            turn = len(calls)
+        if context_tokens is not None:
+            print(f"[routing] {route} turn {turn}: ~{context_tokens} context tokens, {seconds:.1f}s")
+
+    def summary(self) -> Dict[str, Dict]:
+        with self._lock:
+            report = {}
+            for route, calls in self.calls.items():
+                seconds = [c["seconds"] for c in calls]
+                report[route] = {
+                    "models": sorted({c["model"] for c in calls}),
+                    "calls": len(calls),
+                    "tokens": sum(c["tokens"] for c in calls),
+                    "total_seconds": round(sum(seconds), 3),
+                    "avg_seconds": round(sum(seconds) / len(seconds), 3),
+                    "max_seconds": max(seconds),
+                    "context_tokens_per_turn": [c["context_tokens"] for c in calls if c["context_tokens"] is not None],
+                }
+            return report
+
+    def write_log(self):
+        """Write the per-route latency report next to the other run outputs."""
+        report = {"budget_tokens_used": self.budget.tokens, "routes": self.summary()}
+        with open(self.log_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Model routing report written to {self.log_path}")
@@ -0,0 +1,189 @@
+import difflib
+import hashlib
+import os
+import re
+import threading
+from typing import Callable, Dict, List, Optional
+
+
+SCRATCHPAD_DIR = ".scratchpad"
+
+# Outputs at or below this many characters go back to the agent unchanged
+DEFAULT_LIMIT = 1500
+TOOL_LIMITS = {
+    "Design Image Analyzer": 8000,
+    # Build banners are always reduced to a status line and the error lines
+    "Maven Build Tool": 0,
+}
+
+# Tools whose summary starts with a status line that must reach the agent
+# even when the output is sent as a diff against the previous call
+STATUS_TOOLS = {"Maven Build Tool"}
+
+_ERROR_RE = re.compile(r"ERROR|Exception|FAILURE")
+_BLOCK_RE = re.compile(r"(<(style|script)\b[^>]*>)(.*?)(</\2>)", re.IGNORECASE | re.DOTALL)
+
+
+def _line_of(text: str, offset: int) -> int:
+    return text.count("\n", 0, offset) + 1
+
+
+def _footer(handle: str, content: str) -> str:
+    return (f"[Full output: handle '{handle}', {len(content.splitlines())} lines. "
+            f"Use the Tool Output Fetcher with this handle to read any line range.]")
+
+
+def summarize_html(content: str, handle: str) -> str:
+    """Keep the markup but replace <style>/<script> bodies with line references."""
+    def elide(match):
+        body = match.group(3)
+        if len(body) < 200:
+            return match.group(0)
+        start = _line_of(content, match.start(3))
+        end = _line_of(content, match.end(3))
+        kind = "CSS" if match.group(2).lower() == "style" else "JS"
+        return f"{match.group(1)}\n  /* {kind} omitted: lines {start}-{end} */\n{match.group(4)}"
+
+    return _BLOCK_RE.sub(elide, content) + "\n\n" + _footer(handle, content)
+
+
+def summarize_text(content: str, handle: str, head_lines: int = 40) -> str:
+    """First lines plus any markdown or numbered section headings after them."""
+    lines = content.splitlines()
+    head = lines[:head_lines]
+    headings = [
+        f"  line {i + 1}: {line.strip()}"
+        for i, line in enumerate(lines[head_lines:], start=head_lines)
+        if re.match(r"^\s*(#{1,6}\s|\d+\.\s+[A-Z])", line)
+    ]
+    parts = ["\n".join(head)]
+    if len(lines) > head_lines:
+        parts.append(f"... {len(lines) - head_lines} more lines.")
+        if headings:
+            parts.append("Sections further down:\n" + "\n".join(headings[:30]))
+    parts.append(_footer(handle, content))
+    return "\n\n".join(parts)
+
+
+def summarize_maven(content: str, handle: str) -> str:
+    """One status line, plus the error lines for failed builds."""
+    lines = content.splitlines()
+    command = next((l.split(":", 1)[1].strip() for l in lines if l.startswith("Command:")), "")
+    if "Completed Successfully" in content:
+        return (f"Maven build SUCCESS ({command}). Packages installed in AEM at http://localhost:4502.\n"
+                + _footer(handle, content))
+
+    code = next((l.split(":", 1)[1].strip() for l in lines if l.startswith("Return Code:")), "?")
+    errors: List[str] = []
+    for line in lines:
+        line = line.strip()
+        if _ERROR_RE.search(line) and line not in errors and not line.startswith("Maven Build"):
+            errors.append(line)
+    shown = "\n".join(errors[:15]) or "\n".join(lines[-15:])
+    more = f"\n... {len(errors) - 15} more error lines" if len(errors) > 15 else ""
+    return f"Maven build FAILED ({command}, return code {code}).\nErrors:\n{shown}{more}\n" + _footer(handle, content)
+
+
+SUMMARIZERS: Dict[str, Callable[[str, str], str]] = {
+    "File Reader": lambda content, handle: (
+        summarize_html(content, handle) if "<html" in content.lower() else summarize_text(content, handle)
+    ),
+    "Design Image Analyzer": summarize_text,
+    "Maven Build Tool": summarize_maven,
+}
+
+
+class Scratchpad:
+    """
+    Out-of-band store for full tool outputs.
+    Agents see a compact summary (or a diff against the last output for the
+    same tool call) plus a handle they can pass to the Tool Output Fetcher.
+    """
+
+    def __init__(self, directory: str = SCRATCHPAD_DIR):
+        self.directory = directory
+        self._outputs: Dict[str, str] = {}
+        self._latest: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.chars_in = 0
+        self.chars_out = 0
+
+    def put(self, tool_name: str, content: str) -> str:
+        """Store content and return its handle."""
+        digest = hashlib.sha1(content.encode("utf-8")).hexdigest()[:10]
+        prefix = re.sub(r"[^a-z0-9]+", "-", tool_name.lower()).strip("-")
+        handle = f"{prefix}-{digest}"
+        with self._lock:
+            self._outputs[handle] = content
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, f"{handle}.txt"), "w", encoding="utf-8") as f:
+                f.write(content)
+        except OSError as e:
+            print(f"Warning: could not persist scratchpad entry {handle}: {e}")
+        return handle
+
+    def get(self, handle: str) -> Optional[str]:
+        with self._lock:
+            if handle in self._outputs:
+                return self._outputs[handle]
+        path = os.path.join(self.directory, f"{os.path.basename(handle)}.txt")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+        return None
+
+    def compact(self, tool_name: str, call_key: str, output: str, scope: str = "") -> str:
+        """
+        Return what the agent should see for a tool output. call_key
+        identifies repeat calls (e.g. the same file path) for diffing; scope
+        keeps that history private to one task run, since other agents never
+        saw its earlier outputs.
+        """
+        output = str(output)
+        limit = TOOL_LIMITS.get(tool_name, DEFAULT_LIMIT)
+        if len(output) <= limit or output.startswith("Error"):
+            self._count(output, output)
+            return output
+
+        handle = self.put(tool_name, output)
+        key = f"{scope}:{tool_name}:{call_key}"
+        with self._lock:
+            previous = self._latest.get(key)
+            self._latest[key] = handle
+
+        summary = SUMMARIZERS.get(tool_name, summarize_text)(output, handle)
+        result = summary
+        if previous == handle:
+            result = f"Unchanged since the last identical call (handle '{handle}')."
+        elif previous:
+            diff = "\n".join(difflib.unified_diff(
+                self.get(previous).splitlines(), output.splitlines(),
+                fromfile=previous, tofile=handle, lineterm="", n=2
+            ))
+            if len(diff) < len(summary):
+                result = f"Changes since the last call (handle '{previous}'):\n{diff}\n\n{_footer(handle, output)}"
+        if tool_name in STATUS_TOOLS and result is not summary:
+            result = summary.splitlines()[0] + "\n" + result
+
+        self._count(output, result)
+        print(f"[scratchpad] {tool_name}: {len(output)} -> {len(result)} chars (handle {handle})")
+        return result
+
+    def read(self, handle: str, start_line: int = 1, max_lines: int = 200) -> str:
+        """Line range of a stored output, numbered so the agent can page through it."""
+        content = self.get(handle)
+        if content is None:
+            return f"Error: No stored tool output with handle '{handle}'"
+        lines = content.splitlines()
+        start = max(1, start_line)
+        chunk = lines[start - 1:start - 1 + max_lines]
+        body = "\n".join(f"{start + i}: {line}" for i, line in enumerate(chunk))
+        end = start + len(chunk) - 1
+        more = f"\n[Lines {start}-{end} of {len(lines)}. Continue with start_line={end + 1}.]" if end < len(lines) else ""
+        return body + more
+
+    def _count(self, original: str, returned: str):
+        with self._lock:
+            self.chars_in += len(original)
+            self.chars_out += len(returned)
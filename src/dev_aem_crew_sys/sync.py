@@ -0,0 +1,321 @@
+import io
+import os
+import re
+import threading
+import time
+import zipfile
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import unquote
+from xml.etree import ElementTree
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+JCR_ROOT = os.path.join("ui.apps", "src", "main", "content", "jcr_root")
+CORE_SOURCES = os.path.join("core", "src", "main", "java")
+PACKAGE_NAME = "dev-aem-crew-sync"
+PACKAGE_GROUP = "dev-aem-crew-sys"
+
+# Editor and VCS leftovers that never belong in the repository
+_IGNORED_RE = re.compile(r"(^|/)(\.vlt|\.DS_Store|\.git|.*~|.*\.swp|.*\.tmp)(/|$)")
+_NAMESPACE_RE = re.compile(r"^_([a-zA-Z0-9]+)_(.+)$")
+_STATUS_RE = re.compile(r'<status code="(\d+)">(.*?)</status>', re.DOTALL)
+
+Snapshot = Dict[str, Tuple[int, int]]
+
+
+def decode_segment(segment: str) -> str:
+    """FileVault file name -> JCR name (e.g. '_cq_dialog' -> 'cq:dialog')."""
+    match = _NAMESPACE_RE.match(segment)
+    if match:
+        segment = f"{match.group(1)}:{match.group(2)}"
+    return unquote(segment)
+
+
+def to_jcr_path(rel_path: str) -> str:
+    parts = [p[:-4] if p.endswith(".dir") else p for p in rel_path.split("/") if p]
+    return "/" + "/".join(decode_segment(p) for p in parts)
+
+
+def _is_docview(path: str) -> bool:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return "<jcr:root" in f.read(512)
+    except (OSError, UnicodeDecodeError):
+        return False
+
+
+def _inline_children(path: str) -> List[str]:
+    """Names of the child nodes serialized inline in a .content.xml file."""
+    try:
+        root = ElementTree.parse(path).getroot()
+    except (OSError, ElementTree.ParseError):
+        return []
+    names = []
+    for child in root:
+        tag = child.tag
+        if tag.startswith("{"):
+            # Only the well-known prefixes matter for node names in ui.apps
+            namespace, local = tag[1:].split("}", 1)
+            prefix = {"http://www.jcp.org/jcr/1.0": "jcr", "http://www.day.com/jcr/cq/1.0": "cq",
+                      "http://sling.apache.org/jcr/sling/1.0": "sling"}.get(namespace)
+            tag = f"{prefix}:{local}" if prefix else local
+        names.append(decode_segment(tag))
+    return names
+
+
+class FilterEntry:
+    """One workspace filter root plus the package files that cover it."""
+
+    def __init__(self, root: str, includes: Optional[List[str]] = None):
+        self.root = root
+        self.includes = includes
+        self.files: Set[str] = set()
+
+    def xml(self) -> str:
+        if not self.includes:
+            return f'    <filter root="{self.root}"/>'
+        rules = "\n".join(f'        <include pattern="{p}"/>' for p in self.includes)
+        return f'    <filter root="{self.root}">\n{rules}\n    </filter>'
+
+
+def build_filters(jcr_root: str, changed: Set[str], deleted: Set[str]) -> List[FilterEntry]:
+    """
+    Map changed and deleted files (relative to jcr_root) to the smallest
+    filter roots that update exactly those nodes.
+    """
+    entries: Dict[str, FilterEntry] = {}
+
+    def entry(root: str, includes: Optional[List[str]] = None) -> FilterEntry:
+        if root not in entries:
+            entries[root] = FilterEntry(root, includes)
+        return entries[root]
+
+    for rel in sorted(changed):
+        full = os.path.join(jcr_root, rel)
+        directory, name = os.path.split(rel)
+        if name == ".content.xml" and not directory.endswith(".dir"):
+            node = to_jcr_path(directory)
+            if os.listdir(os.path.join(jcr_root, directory)) == [".content.xml"]:
+                # The file holds the whole subtree (e.g. _cq_dialog/.content.xml): replace it
+                entry(node).files.add(rel)
+            else:
+                # Node properties plus child nodes serialized inline; sibling files are left alone
+                escaped = re.escape(node)
+                includes = [escaped] + [f"{escaped}/{re.escape(c)}(/.*)?" for c in _inline_children(full)]
+                entry(node, includes).files.add(rel)
+        elif name == ".content.xml":
+            # Properties of a file node (<file>.dir/.content.xml)
+            file_rel = directory[:-4]
+            target = entry(to_jcr_path(file_rel))
+            target.files.add(rel)
+            if os.path.exists(os.path.join(jcr_root, file_rel)):
+                target.files.add(file_rel)
+        elif name.endswith(".xml") and _is_docview(full):
+            # Flat docview file such as _cq_dialog.xml holds a whole subtree
+            entry(to_jcr_path(rel[:-4])).files.add(rel)
+        else:
+            target = entry(to_jcr_path(rel))
+            target.files.add(rel)
+            dir_props = rel + ".dir/.content.xml"
+            if os.path.exists(os.path.join(jcr_root, dir_props)):
+                target.files.add(dir_props)
+
+    for rel in sorted(deleted):
+        # Delete the topmost node that no longer exists on disk
+        parts = rel.split("/")
+        for depth in range(1, len(parts) + 1):
+            candidate = "/".join(parts[:depth])
+            if not os.path.exists(os.path.join(jcr_root, candidate)):
+                break
+        directory, name = os.path.split(candidate)
+        if candidate.endswith(".dir") or (name == ".content.xml" and directory.endswith(".dir")):
+            # Properties of a file node (<file>.dir) were removed, not the file itself:
+            # re-install the file so it falls back to its default properties
+            file_rel = (candidate if candidate.endswith(".dir") else directory)[:-4]
+            target = entry(to_jcr_path(file_rel))
+            if os.path.exists(os.path.join(jcr_root, file_rel)):
+                target.files.add(file_rel)
+            continue
+        if name == ".content.xml":
+            continue
+        entry(to_jcr_path(candidate))
+        if candidate.endswith(".xml"):
+            # It may have been a flat docview file (e.g. _cq_dialog.xml); deleting a missing node is a no-op
+            entry(to_jcr_path(candidate[:-4]))
+
+    return list(entries.values())
+
+
+def build_package(jcr_root: str, filters: List[FilterEntry]) -> bytes:
+    """Zip a FileVault content package containing only the given filters."""
+    filter_xml = ('<?xml version="1.0" encoding="UTF-8"?>\n<workspaceFilter version="1.0">\n'
+                  + "\n".join(f.xml() for f in filters) + "\n</workspaceFilter>\n")
+    properties_xml = f"""<?xml version="1.0" encoding="utf-8" standalone="no"?>
+<!DOCTYPE properties SYSTEM "http://java.sun.com/dtd/properties.dtd">
+<properties>
+<entry key="name">{PACKAGE_NAME}</entry>
+<entry key="group">{PACKAGE_GROUP}</entry>
+<entry key="version">1.0.0</entry>
+<entry key="description">Incremental sync from the watch mode</entry>
+</properties>
+"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as package:
+        package.writestr("META-INF/vault/filter.xml", filter_xml)
+        package.writestr("META-INF/vault/properties.xml", properties_xml)
+        for rel in sorted({f for entry in filters for f in entry.files}):
+            package.write(os.path.join(jcr_root, rel), f"jcr_root/{rel}")
+    return buffer.getvalue()
+
+
+class AemSync:
+    """
+    Watches the ui.apps jcr_root tree of an AEM project and pushes each
+    debounced burst of changes to a running instance as one small content
+    package over a pooled HTTP session. Changes under core/src/main/java
+    trigger the full Maven build instead.
+    """
+
+    def __init__(self, aem_project_path: str, host: Optional[str] = None, user: Optional[str] = None,
+                 password: Optional[str] = None, full_build: Optional[Callable[[], str]] = None,
+                 interval: float = 0.1, debounce: float = 0.15, retry_delay: float = 2.0):
+        self.project = aem_project_path
+        self.jcr_root = os.path.join(aem_project_path, JCR_ROOT)
+        self.core_root = os.path.join(aem_project_path, CORE_SOURCES)
+        self.host = (host or os.getenv("AEM_HOST", "http://localhost:4502")).rstrip("/")
+        self.full_build = full_build
+        self.interval = interval
+        self.debounce = debounce
+        self.retry_delay = retry_delay
+        self.latencies: List[float] = []
+
+        # One keep-alive connection pool for every sync request
+        self.session = requests.Session()
+        self.session.auth = (user or os.getenv("AEM_USER", "admin"), password or os.getenv("AEM_PASSWORD", "admin"))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=1)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def scan(self, root: str) -> Snapshot:
+        snapshot: Snapshot = {}
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not _IGNORED_RE.search(d)]
+            for name in filenames:
+                rel = os.path.relpath(os.path.join(dirpath, name), root).replace(os.sep, "/")
+                if _IGNORED_RE.search(rel):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(dirpath, name))
+                except OSError:
+                    continue
+                snapshot[rel] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    @staticmethod
+    def diff(before: Snapshot, after: Snapshot) -> Tuple[Set[str], Set[str]]:
+        changed = {p for p, sig in after.items() if before.get(p) != sig}
+        deleted = set(before) - set(after)
+        return changed, deleted
+
+    def push(self, changed: Set[str], deleted: Set[str]) -> str:
+        """Install only the changed nodes and files through the Package Manager service."""
+        filters = build_filters(self.jcr_root, changed, deleted)
+        package = build_package(self.jcr_root, filters)
+        response = self.session.post(
+            f"{self.host}/crx/packmgr/service.jsp",
+            files={"file": (f"{PACKAGE_NAME}.zip", package, "application/zip")},
+            data={"name": PACKAGE_NAME, "force": "true", "install": "true"},
+            timeout=30,
+        )
+        response.raise_for_status()
+        match = _STATUS_RE.search(response.text)
+        if match and match.group(1) != "200":
+            raise RuntimeError(f"Package install failed ({match.group(1)}): {match.group(2).strip()}")
+        return ", ".join(f.root for f in filters)
+
+    def _sync(self, ui_changes: Tuple[Set[str], Set[str]], core_changed: bool, edited_at: float) -> bool:
+        """
+        Push one batch. edited_at is the wall-clock time of the newest edit in
+        it. Returns False when the push failed and the batch must be retried.
+        """
+        started = time.perf_counter()
+        changed, deleted = ui_changes
+        try:
+            if changed or deleted:
+                roots = self.push(changed, deleted)
+                elapsed = time.perf_counter() - started
+                latency = time.time() - edited_at
+                self.latencies.append(latency)
+                print(f"[sync] {len(changed)} changed, {len(deleted)} deleted -> {roots} "
+                      f"(push {elapsed:.2f}s, edit-to-sync {latency:.2f}s)")
+        except Exception as e:
+            print(f"[sync] Error syncing changes, retrying in {self.retry_delay:.0f}s: {e}")
+            return False
+
+        if core_changed:
+            try:
+                if self.full_build:
+                    print("[sync] core Java changed - running full Maven build")
+                    print(self.full_build())
+                else:
+                    print("[sync] core Java changed - run a full Maven build to deploy it")
+            except Exception as e:
+                print(f"[sync] Error running the full Maven build: {e}")
+        return True
+
+    def watch(self, stop: Optional[threading.Event] = None):
+        """
+        Poll both trees until stopped. A batch is pushed once no further
+        change has been seen for the debounce period.
+        """
+        stop = stop or threading.Event()
+        if not os.path.isdir(self.jcr_root):
+            raise FileNotFoundError(f"ui.apps jcr_root not found at: {self.jcr_root}")
+
+        ui_snapshot = self.scan(self.jcr_root)
+        core_snapshot = self.scan(self.core_root)
+        pending_changed: Set[str] = set()
+        pending_deleted: Set[str] = set()
+        core_changed = False
+        edited_at = last_change = None
+        print(f"[sync] Watching {self.jcr_root} -> {self.host}")
+
+        try:
+            while not stop.is_set():
+                stop.wait(self.interval)
+                now = time.perf_counter()
+
+                ui_now = self.scan(self.jcr_root)
+                changed, deleted = self.diff(ui_snapshot, ui_now)
+                ui_snapshot = ui_now
+                core_now = self.scan(self.core_root)
+                core_delta = core_now != core_snapshot
+                core_snapshot = core_now
+
+                if changed or deleted or core_delta:
+                    core_changed = core_changed or core_delta
+                    # A file deleted and re-created within one burst is a change, not a delete
+                    pending_changed = (pending_changed | changed) - deleted
+                    pending_deleted = (pending_deleted | deleted) - changed
+                    # Latency runs from the newest edit (its mtime), not from when the
+                    # poll noticed it; deletions carry no mtime, so they count from now
+                    newest = max((ui_now[p][0] / 1e9 for p in changed), default=None)
+                    edited_at = max(edited_at or 0.0, newest if newest is not None else time.time())
+                    last_change = now
+                    continue
+
+                if last_change is not None and now - last_change >= self.debounce:
+                    if self._sync((pending_changed, pending_deleted), core_changed, edited_at):
+                        pending_changed, pending_deleted = set(), set()
+                        core_changed = False
+                        edited_at = last_change = None
+                    else:
+                        # Keep the batch; new edits are merged into it before the retry
+                        last_change = now + self.retry_delay - self.debounce
+        finally:
+            if self.latencies:
+                print(f"[sync] {len(self.latencies)} syncs, average edit-to-sync "
+                      f"{sum(self.latencies) / len(self.latencies):.2f}s, max {max(self.latencies):.2f}s")
+            self.session.close()
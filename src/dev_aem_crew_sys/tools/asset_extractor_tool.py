@@ -0,0 +1,127 @@
+from crewai.tools import BaseTool
+from typing import Any, Optional, Type
+from pydantic import BaseModel, Field
+import base64
+import io
+import json
+import os
+from contextlib import nullcontext
+from anthropic import Anthropic
+from PIL import Image
+
+from dev_aem_crew_sys.assets import extract_assets, scale_regions, vision_scale
+
+
+class AssetExtractorInput(BaseModel):
+    """Input schema for AssetExtractorTool."""
+    image_path: str = Field(..., description="Path to the design mockup image (e.g., './design.png')")
+    output_folder: str = Field(default="output", description="Folder of the HTML components; assets go to <folder>/assets (default: 'output')")
+    aem_project_path: str = Field(default="", description="Absolute path to the AEM project root; if set, assets are also written to the ui.content DAM")
+    aem_app_id: str = Field(default="", description="AEM app id used for the DAM folder /content/dam/<app id>/design-assets")
+
+
+class AssetExtractorTool(BaseTool):
+    name: str = "Design Asset Extractor"
+    description: str = (
+        "Finds the real imagery in a design mockup (hero/background photos, logos, icons, "
+        "illustrations), crops it out and writes responsive, optimized image variants with "
+        "content-hash filenames to the output folder and the AEM DAM. Returns ready-to-use "
+        "<picture> markup with srcset for each asset plus its DAM path."
+    )
+    args_schema: Type[BaseModel] = AssetExtractorInput
+    model: str = "claude-3-5-sonnet-20241022"
+    # Optional ModelRouter that tracks this tool's calls
+    router: Optional[Any] = Field(default=None, exclude=True)
+
+    def _find_regions(self, image_path: str) -> list:
+        """
+        Ask the vision model for pixel bounding boxes of exportable imagery.
+        """
+        # Send the image within the API size limits ourselves, so the boxes come
+        # back in known coordinates, then scale them up to the original
+        with Image.open(image_path) as image:
+            scale = vision_scale(image.size)
+            if scale < 1:
+                image = image.resize((round(image.width * scale), round(image.height * scale)), Image.LANCZOS)
+            width, height = image.size
+            if scale < 1:
+                buffer = io.BytesIO()
+                image.save(buffer, "PNG")
+                image_bytes, mime_type = buffer.getvalue(), "image/png"
+            else:
+                with open(image_path, "rb") as image_file:
+                    image_bytes = image_file.read()
+                extension = os.path.splitext(image_path)[1].lower()
+                mime_type = {'.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.webp': 'image/webp'}.get(extension, 'image/png')
+        base64_image = base64.b64encode(image_bytes).decode('utf-8')
+
+        prompt = f"""This web design mockup is {width}x{height} pixels.
+Identify every region that must be exported as a standalone image asset:
+hero or section background photos, logos, icons and illustrations.
+Do NOT include plain text, buttons, or areas of solid color.
+
+Return ONLY JSON in this exact format, with pixel coordinates of tight bounding boxes:
+{{"regions": [{{"name": "hero-background", "kind": "background|photo|logo|icon|illustration", "alt": "short description", "x": 0, "y": 0, "width": 100, "height": 100}}]}}"""
+
+        client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+        with self.router.track("tool:assets", self.model) if self.router else nullcontext({}) as usage:
+            message = client.messages.create(
+                model=self.model,
+                max_tokens=2048,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {
+                                "type": "image",
+                                "source": {"type": "base64", "media_type": mime_type, "data": base64_image},
+                            },
+                            {"type": "text", "text": prompt}
+                        ],
+                    }
+                ],
+            )
+            usage["tokens"] = message.usage.input_tokens + message.usage.output_tokens
+
+        text = message.content[0].text
+        regions = json.loads(text[text.index("{"):text.rindex("}") + 1]).get("regions", [])
+        return scale_regions(regions, scale) if scale < 1 else regions
+
+    def _run(self, image_path: str, output_folder: str = "output", aem_project_path: str = "", aem_app_id: str = "") -> str:
+        """
+        Locate, crop and export the design imagery, then summarize the results.
+        """
+        try:
+            if not os.path.exists(image_path):
+                return f"Error: Image file not found at path: {image_path}"
+            if not os.getenv("ANTHROPIC_API_KEY"):
+                return "Error: ANTHROPIC_API_KEY not found in environment variables."
+
+            regions = self._find_regions(image_path)
+            if not regions:
+                return "No exportable imagery found in the design."
+
+            project = aem_project_path if aem_project_path and os.path.isdir(aem_project_path) else None
+            manifest = extract_assets(
+                image_path,
+                regions,
+                output_folder=output_folder,
+                aem_project_path=project,
+                aem_app_id=aem_app_id or None
+            )
+
+            lines = [f"DESIGN ASSETS EXPORTED ({', '.join(manifest['formats'])}) to {output_folder}/assets:"]
+            for asset in manifest["assets"]:
+                lines.append(f"\n{asset['name']} ({asset['kind']}, {len(asset['variants'])} files)")
+                lines.append(f"HTML (relative to {output_folder}/):\n{asset['html']}")
+                if asset["dam_path"]:
+                    lines.append(f"AEM DAM path: {asset['dam_path']}")
+            if aem_project_path and not project:
+                lines.append(f"\nAEM project not found at {aem_project_path}; DAM files were not written.")
+            lines.append(f"\nManifest: {output_folder}/assets/manifest.json")
+            if project:
+                lines.append(f"DAM path list: {output_folder}/assets/dam-assets.txt")
+            return "\n".join(lines)
+
+        except Exception as e:
+            return f"Error extracting design assets: {str(e)}"
@@ -0,0 +1,45 @@
+from crewai.tools import BaseTool
+from typing import Any
+from pydantic import Field
+import uuid
+
+
+class CompactedTool(BaseTool):
+    """
+    Wraps another tool so its full output is stored in the scratchpad and
+    the agent only sees a compact summary or diff plus a handle.
+    Repeat calls are only diffed within one scope (one task run).
+    """
+    name: str = ""
+    description: str = ""
+    tool: BaseTool = Field(..., exclude=True)
+    scratchpad: Any = Field(..., exclude=True)
+    scope: str = Field(default="", exclude=True)
+
+    def __init__(self, tool: BaseTool, scratchpad: Any, **kwargs):
+        super().__init__(
+            name=tool.name,
+            # BaseTool prefixes the description with the tool name and arguments;
+            # pass the original so the prefix is not applied twice
+            description=type(tool).model_fields["description"].default,
+            args_schema=tool.args_schema,
+            # Never serve from crewAI's tool cache: the scratchpad handles repeat
+            # calls, and a cached read would hide edits made since
+            cache_function=lambda _args=None, _result=None: False,
+            tool=tool,
+            scratchpad=scratchpad,
+            **kwargs
+        )
+
+    def scoped(self, scope: str) -> "CompactedTool":
+        """A copy of this wrapper whose repeat-call diffs are private to one task run."""
+        return CompactedTool(self.tool, self.scratchpad, scope=f"{scope}-{uuid.uuid4().hex[:8]}")
+
+    def _run(self, **kwargs) -> str:
+        """
+        Run the wrapped tool and compact its output.
+        Repeat calls with the same arguments in the same scope are diffed against the last output.
+        """
+        output = self.tool._run(**kwargs)
+        call_key = "|".join(f"{k}={v}" for k, v in sorted(kwargs.items()))
+        return self.scratchpad.compact(self.tool.name, call_key, output, scope=self.scope)
@@ -1,8 +1,10 @@
 from crewai.tools import BaseTool
-from typing import Type
-from pydantic import BaseModel, Field
+from typing import Any, Callable, Optional, Type
+from pydantic import BaseModel, Field, PrivateAttr
 import subprocess
+import threading
 import os
+from contextlib import nullcontext
 
 
 class MavenToolInput(BaseModel):
@@ -23,8 +25,34 @@ class MavenTool(BaseTool):
         "Default command is 'clean install -PautoInstallPackage' which builds and deploys to local AEM."
     )
     args_schema: Type[BaseModel] = MavenToolInput
+    # A build depends on the project files, not just the arguments: never serve it from the tool cache
+    cache_function: Callable = lambda _args=None, _result=None: False
+    # Optional ProjectLock held exclusively while Maven runs, so the build never
+    # sees another component's half-written files
+    project_lock: Optional[Any] = Field(default=None, exclude=True)
+    # Last result per calling thread, so a pipeline stage can check its own build
+    _results: Any = PrivateAttr(default_factory=threading.local)
+
+    @staticmethod
+    def succeeded(result: Optional[str]) -> bool:
+        return bool(result) and result.startswith("Maven Build Completed Successfully")
+
+    def pop_result(self) -> Optional[str]:
+        """Return and clear the last result recorded on this thread."""
+        result = getattr(self._results, "value", None)
+        self._results.value = None
+        return result
 
     def _run(self, aem_project_path: str, maven_command: str = "clean install -PautoInstallPackage") -> str:
+        try:
+            with self.project_lock.exclusive() if self.project_lock else nullcontext():
+                result = self._build(aem_project_path, maven_command)
+        except RuntimeError as e:
+            result = f"Error executing Maven build: {str(e)}"
+        self._results.value = result
+        return result
+
+    def _build(self, aem_project_path: str, maven_command: str) -> str:
         """
         Execute Maven build command in the AEM project directory.
         Returns build output and status.
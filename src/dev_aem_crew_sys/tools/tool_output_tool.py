@@ -0,0 +1,27 @@
+from crewai.tools import BaseTool
+from typing import Any, Type
+from pydantic import BaseModel, Field
+
+
+class ToolOutputInput(BaseModel):
+    """Input schema for ToolOutputTool."""
+    handle: str = Field(..., description="The handle shown in a compacted tool output (e.g., 'file-reader-5aa7dd90e9')")
+    start_line: int = Field(default=1, description="First line to return (default: 1)")
+    max_lines: int = Field(default=200, description="Maximum number of lines to return (default: 200)")
+
+
+class ToolOutputTool(BaseTool):
+    name: str = "Tool Output Fetcher"
+    description: str = (
+        "Reads the full output of an earlier tool call that was shortened to a summary. "
+        "Provide the handle from the summary and optionally a start line and line count "
+        "to read only the part you need (e.g., the CSS lines of an HTML file)."
+    )
+    args_schema: Type[BaseModel] = ToolOutputInput
+    scratchpad: Any = Field(..., exclude=True)
+
+    def _run(self, handle: str, start_line: int = 1, max_lines: int = 200) -> str:
+        """
+        Return a numbered line range of a stored tool output.
+        """
+        return self.scratchpad.read(handle, start_line=start_line, max_lines=max_lines)
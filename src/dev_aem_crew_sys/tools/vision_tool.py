@@ -1,8 +1,9 @@
 from crewai.tools import BaseTool
-from typing import Type
+from typing import Any, Optional, Type
 from pydantic import BaseModel, Field
 import base64
 import os
+from contextlib import nullcontext
 from anthropic import Anthropic
 
 
@@ -20,6 +21,9 @@ class VisionTool(BaseTool):
         "Claude's vision capabilities and return the full analysis."
     )
     args_schema: Type[BaseModel] = VisionToolInput
+    model: str = "claude-3-5-sonnet-20241022"
+    # Optional ModelRouter that tracks this tool's calls
+    router: Optional[Any] = Field(default=None, exclude=True)
 
     def _run(self, image_path: str) -> str:
         """
@@ -182,29 +186,31 @@ This analysis will be used to create pixel-perfect HTML/CSS components, so accur
 Be EXTREMELY specific and accurate. This analysis will be used directly to create components that must look 90%+ identical to the design."""
 
             # Make API call with vision
-            message = client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=4096,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": mime_type,
-                                    "data": base64_image,
+            with self.router.track("tool:vision", self.model) if self.router else nullcontext({}) as usage:
+                message = client.messages.create(
+                    model=self.model,
+                    max_tokens=4096,
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": [
+                                {
+                                    "type": "image",
+                                    "source": {
+                                        "type": "base64",
+                                        "media_type": mime_type,
+                                        "data": base64_image,
+                                    },
                                 },
-                            },
-                            {
-                                "type": "text",
-                                "text": analysis_prompt
-                            }
-                        ],
-                    }
-                ],
-            )
+                                {
+                                    "type": "text",
+                                    "text": analysis_prompt
+                                }
+                            ],
+                        }
+                    ],
+                )
+                usage["tokens"] = message.usage.input_tokens + message.usage.output_tokens
 
             # Extract the analysis from the response
             analysis = message.content[0].text
@@ -0,0 +1,133 @@
+import json
+import os
+
+from PIL import Image
+
+from dev_aem_crew_sys import assets
+from dev_aem_crew_sys.assets import (DAM_INDEX_NAME, MANIFEST_NAME, VISION_MAX_EDGE, clamp_region,
+                                     extract_assets, output_formats, scale_regions, vision_scale)
+
+
+def design(tmp_path, size=(1200, 800)):
+    path = str(tmp_path / "design.png")
+    image = Image.new("RGB", size, "white")
+    # Some detail so crops of different regions hash differently
+    for x in range(0, size[0], 10):
+        image.putpixel((x, x % size[1]), (x % 256, 0, 0))
+    image.save(path)
+    return path
+
+
+def test_clamp_region():
+    assert clamp_region({"x": 10, "y": 20, "width": 100, "height": 50}, (800, 600)) == (10, 20, 110, 70)
+    # Boxes running off the image are clipped to it
+    assert clamp_region({"x": -5, "y": 550, "width": 100, "height": 100}, (800, 600)) == (0, 550, 95, 600)
+    assert clamp_region({"x": "12", "y": 0, "width": 50.0, "height": 50}, (800, 600)) == (12, 0, 62, 50)
+
+
+def test_clamp_region_rejects_invalid():
+    assert clamp_region({"x": 0, "y": 0, "width": 4, "height": 100}, (800, 600)) is None
+    assert clamp_region({"x": 900, "y": 0, "width": 100, "height": 100}, (800, 600)) is None
+    assert clamp_region({"x": 0, "y": 0, "width": 100}, (800, 600)) is None
+    assert clamp_region({"x": None, "y": 0, "width": 100, "height": 100}, (800, 600)) is None
+
+
+def test_vision_scale():
+    assert vision_scale((1000, 800)) == 1.0
+    # Long edge capped
+    assert round(3136 * vision_scale((3136, 400))) == VISION_MAX_EDGE
+    # Pixel count capped even when the long edge fits
+    scale = vision_scale((1500, 1500))
+    assert scale < 1 and (1500 * scale) ** 2 <= assets.VISION_MAX_PIXELS
+
+
+def test_scale_regions():
+    regions = [{"name": "hero", "x": 10, "y": 20, "width": 100, "height": 50}, {"name": "broken"}]
+    assert scale_regions(regions, 0.5) == [
+        {"name": "hero", "x": 20, "y": 40, "width": 200, "height": 100},
+        {"name": "broken"},
+    ]
+    assert regions[0]["x"] == 10
+
+
+def test_extract_assets_writes_variants(tmp_path):
+    output = str(tmp_path / "output")
+    regions = [
+        {"name": "Hero Background", "kind": "background", "alt": "Beach", "x": 0, "y": 0, "width": 1200, "height": 400},
+        {"name": "logo", "kind": "logo", "x": 10, "y": 10, "width": 4, "height": 4},
+    ]
+
+    manifest = extract_assets(design(tmp_path), regions, output_folder=output)
+
+    (asset,) = manifest["assets"]
+    assert asset["name"] == "hero-background"
+    assert asset["box"] == [0, 0, 1200, 400]
+    formats = output_formats()
+    # Widths below the crop (1600 would upscale), plus the crop itself
+    assert sorted({v["width"] for v in asset["variants"]}) == [320, 640, 1024, 1200]
+    assert len(asset["variants"]) == 4 * len(formats)
+    for variant in asset["variants"]:
+        path = os.path.join(output, "assets", variant["file"])
+        assert os.path.getsize(path) == variant["bytes"]
+        with Image.open(path) as image:
+            assert image.size == (variant["width"], variant["height"])
+
+    first, last = formats
+    srcset = ", ".join(f"assets/{v['file']} {v['width']}w" for v in asset["variants"] if v["format"] == first)
+    assert f'<source type="image/{first}" srcset="{srcset}"' in asset["html"]
+    fallback = next(v["file"] for v in asset["variants"] if v["format"] == last and v["width"] == 1200)
+    assert f'<img src="assets/{fallback}"' in asset["html"]
+    assert 'alt="Beach"' in asset["html"]
+    assert asset["dam_path"] is None and asset["dam_html"] is None
+    with open(os.path.join(output, "assets", MANIFEST_NAME), encoding="utf-8") as f:
+        assert json.load(f) == manifest
+    assert not os.path.exists(os.path.join(output, "assets", DAM_INDEX_NAME))
+
+
+def test_extract_assets_writes_dam_layout(tmp_path):
+    output, project = str(tmp_path / "output"), str(tmp_path / "project")
+    regions = [{"name": "logo", "kind": "logo", "alt": "Acme", "x": 100, "y": 100, "width": 300, "height": 100}]
+
+    manifest = extract_assets(design(tmp_path), regions, output_folder=output,
+                              aem_project_path=project, aem_app_id="app")
+
+    (asset,) = manifest["assets"]
+    dam_root = os.path.join(project, "ui.content", "src", "main", "content", "jcr_root",
+                            "content", "dam", "app", "design-assets")
+    for variant in asset["variants"]:
+        node = os.path.join(dam_root, variant["file"])
+        with open(os.path.join(node, ".content.xml"), encoding="utf-8") as f:
+            assert 'jcr:primaryType="dam:Asset"' in f.read()
+        original = os.path.join(node, "_jcr_content", "renditions", "original")
+        with open(original, "rb") as f, open(os.path.join(output, "assets", variant["file"]), "rb") as local:
+            assert f.read() == local.read()
+        with open(original + ".dir" + os.sep + ".content.xml", encoding="utf-8") as f:
+            assert f"image/{variant['format']}" in f.read()
+
+    fallback = output_formats()[-1]
+    assert asset["dam_path"].startswith("/content/dam/app/design-assets/logo.")
+    assert asset["dam_path"].endswith(f".300w.{fallback}")
+    assert 'srcset="/content/dam/app/design-assets/logo.' in asset["dam_html"]
+    with open(os.path.join(output, "assets", DAM_INDEX_NAME), encoding="utf-8") as f:
+        index = f.read().splitlines()
+    assert index[1] == f"logo | logo | Acme | {asset['dam_path']} | 300 | {','.join(output_formats())}"
+
+
+def test_extract_assets_skips_existing_files(tmp_path, monkeypatch):
+    output, project = str(tmp_path / "output"), str(tmp_path / "project")
+    regions = [{"name": "logo", "x": 100, "y": 100, "width": 300, "height": 100}]
+    image = design(tmp_path)
+    first = extract_assets(image, regions, output_folder=output)
+
+    encoded = []
+    encode = assets._encode
+    monkeypatch.setattr(assets, "_encode", lambda img, fmt: encoded.append(fmt) or encode(img, fmt))
+
+    # Local files exist, so only the missing DAM renditions need encoding
+    extract_assets(image, regions, output_folder=output, aem_project_path=project, aem_app_id="app")
+    assert len(encoded) == len(first["assets"][0]["variants"])
+
+    encoded.clear()
+    again = extract_assets(image, regions, output_folder=output, aem_project_path=project, aem_app_id="app")
+    assert encoded == []
+    assert again["assets"][0]["variants"] == first["assets"][0]["variants"]
@@ -0,0 +1,28 @@
+import pytest
+
+pytest.importorskip("crewai")
+
+from dev_aem_crew_sys.scratchpad import Scratchpad
+from dev_aem_crew_sys.tools.compacted_tool import CompactedTool
+from dev_aem_crew_sys.tools.file_reader_tool import FileReaderTool
+
+
+def test_wraps_description_once_and_never_caches(tmp_path):
+    tool = CompactedTool(FileReaderTool(), Scratchpad(str(tmp_path)))
+
+    assert tool.name == "File Reader"
+    assert tool.description.count("Tool Name:") == 1
+    assert tool.cache_function({"file_path": "a"}, "result") is False
+
+
+def test_scoped_copies_keep_separate_history(tmp_path):
+    target = tmp_path / "hero.html"
+    target.write_text("x\n" * 1000)
+    tool = CompactedTool(FileReaderTool(), Scratchpad(str(tmp_path / "pad")))
+    first, second = tool.scoped("convert"), tool.scoped("convert")
+    args = {"filename": target.name, "folder": str(tmp_path)}
+
+    assert first.scope != second.scope
+    assert "Unchanged" not in first._run(**args)
+    assert "Unchanged" in first._run(**args)
+    assert "Unchanged" not in second._run(**args)
@@ -0,0 +1,52 @@
+import json
+import os
+
+from dev_aem_crew_sys import knowledge_index
+from dev_aem_crew_sys.knowledge_index import KnowledgeIndex, chunk_document, estimate_tokens
+
+
+def write(root, rel, content):
+    path = os.path.join(root, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def test_chunks_are_capped_and_code_fences_stay_balanced():
+    code = "\n".join(f"    <field{i} jcr:primaryType=\"nt:unstructured\" name=\"./field{i}\"/>" for i in range(120))
+    text = f"# Guide\n\n## Dialog\n\nIntro paragraph.\n\n```xml\n{code}\n\n{code}\n```\n\nClosing words.\n"
+
+    chunks = chunk_document("guide.md", text, max_tokens=100)
+
+    assert len(chunks) > 3
+    for chunk in chunks:
+        assert estimate_tokens(chunk["text"]) <= 100
+        assert chunk["text"].count("```") % 2 == 0
+        assert chunk["heading"] == "Guide > Dialog"
+
+
+def test_search_ranks_by_query_and_respects_budget(tmp_path):
+    root = str(tmp_path)
+    write(root, "knowledge/htl.md", "# HTL\n\nUse data-sly-use to reference the Sling Model.\n")
+    write(root, "knowledge/maven.md", "# Maven\n\nRun mvn clean install -PautoInstallPackage to deploy.\n")
+
+    index = KnowledgeIndex.build(root, ["knowledge"])
+
+    assert index.search("sling model htl", top_k=1)[0]["source"] == os.path.join("knowledge", "htl.md")
+    assert index.search("maven deploy", top_k=4, token_budget=1) == []
+
+
+def test_cache_is_rebuilt_when_chunking_changes(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    write(root, "knowledge/a.md", "# A\n\n" + "\n\n".join(f"paragraph {i} " * 20 for i in range(20)))
+
+    first = KnowledgeIndex.load_or_build(root, ["knowledge"])
+    assert KnowledgeIndex.load_or_build(root, ["knowledge"]).chunks == first.chunks
+
+    monkeypatch.setattr(knowledge_index, "MAX_CHUNK_TOKENS", 60)
+    monkeypatch.setattr(knowledge_index.chunk_document, "__defaults__", (60,))
+    rebuilt = KnowledgeIndex.load_or_build(root, ["knowledge"])
+
+    assert len(rebuilt.chunks) > len(first.chunks)
+    with open(os.path.join(root, ".knowledge_index.json"), encoding="utf-8") as f:
+        assert json.load(f)["key"].endswith("max60")
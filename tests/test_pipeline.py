@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+from dev_aem_crew_sys.pipeline import ComponentPipeline, ComponentRun, ProjectLock, parse_component_list
+
+
+def test_parse_component_list():
+    text = """Components found in the design:
+
+1. navbar - Top navigation with logo
+   and a dropdown menu
+2. Hero-Section - Full width hero
+3. footer - Links and copyright
+
+These components cover the whole page.
+"""
+    assert parse_component_list(text) == [
+        ("navbar", "Top navigation with logo\nand a dropdown menu"),
+        ("hero-section", "Full width hero"),
+        ("footer", "Links and copyright"),
+    ]
+
+
+def test_parse_component_list_without_items():
+    assert parse_component_list("I could not find any components.") == []
+    assert parse_component_list("") == []
+
+
+def test_waiting_exclusive_blocks_new_shared():
+    lock = ProjectLock()
+    events = []
+    reader_in, writer_waiting = threading.Event(), threading.Event()
+    release_reader = threading.Event()
+
+    def first_reader():
+        with lock.shared():
+            reader_in.set()
+            release_reader.wait(5)
+            events.append("reader 1 done")
+
+    def writer():
+        writer_waiting.set()
+        with lock.exclusive():
+            events.append("writer")
+
+    def second_reader():
+        with lock.shared():
+            events.append("reader 2")
+
+    threads = [threading.Thread(target=first_reader)]
+    threads[0].start()
+    reader_in.wait(5)
+    threads.append(threading.Thread(target=writer))
+    threads[1].start()
+    writer_waiting.wait(5)
+    time.sleep(0.05)
+    threads.append(threading.Thread(target=second_reader))
+    threads[2].start()
+    time.sleep(0.05)
+
+    # The second reader queues behind the waiting writer
+    assert events == []
+    release_reader.set()
+    for thread in threads:
+        thread.join(5)
+    assert events == ["reader 1 done", "writer", "reader 2"]
+
+
+def test_exclusive_inside_shared_on_same_thread_raises():
+    lock = ProjectLock()
+    with lock.shared():
+        with pytest.raises(RuntimeError):
+            with lock.exclusive():
+                pass
+    # The lock is still usable afterwards
+    with lock.exclusive():
+        pass
+
+
+def test_pipeline_marks_failures_and_keeps_other_components():
+    def run_stage(stage, inputs):
+        if stage == "aem_component_conversion_task" and inputs["name"] == "broken":
+            raise RuntimeError("boom")
+        if stage == "aem_build_deploy_task" and inputs["name"] == "unbuildable":
+            return "Maven Build FAILED!"
+        return "ok"
+
+    runs = [ComponentRun(name, {"name": name}) for name in ("good", "broken", "unbuildable")]
+    pipeline = ComponentPipeline(run_stage, is_failure=lambda stage, output: "FAILED" in output)
+    done = {run.name: run for run in pipeline.run(runs)}
+
+    assert not done["good"].failed
+    assert [r.stage for r in done["good"].results] == [
+        "component_html_task", "aem_component_conversion_task", "aem_build_deploy_task"
+    ]
+    # A failed stage stops that component only
+    assert done["broken"].failed and done["broken"].results[-1].stage == "aem_component_conversion_task"
+    assert done["unbuildable"].failed and done["unbuildable"].results[-1].stage == "aem_build_deploy_task"
@@ -0,0 +1,66 @@
+import pytest
+
+pytest.importorskip("crewai")
+
+from crewai.llms.base_llm import BaseLLM
+
+from dev_aem_crew_sys.routing import BudgetExceededError, ModelRouter, RoutedLLM, RunBudget
+
+
+class FakeLLM(BaseLLM):
+    """Inner LLM that reports 100 prompt and 20 completion tokens per call."""
+
+    def call(self, messages, *args, **kwargs):
+        self._track_token_usage_internal({"prompt_tokens": 100, "completion_tokens": 20})
+        return "1. navbar - Top navigation"
+
+
+class FakeRouter(ModelRouter):
+    def create_llm(self, model):
+        return FakeLLM(model=model)
+
+
+@pytest.fixture
+def router(tmp_path):
+    tasks = {"listing": {"model": "fast", "fallback_model": "strong", "output_validator": "component_list"}}
+    return FakeRouter({"dev": {"model": "strong"}}, tasks, budget=RunBudget(),
+                      log_path=str(tmp_path / "routing.json"))
+
+
+def test_usage_includes_escalated_llms(router):
+    llm = router.task_llm("listing", router.agent_llm("dev"))
+    llm.call("hi")
+    assert llm.escalate()
+    llm.call("hi")
+
+    usage = llm.get_token_usage_summary()
+
+    assert (usage.total_tokens, usage.successful_requests) == (240, 2)
+    assert router.summary()["listing"]["models"] == ["fast", "strong"]
+
+
+def test_guardrail_escalates_on_failed_check(router):
+    llm = router.task_llm("listing", router.agent_llm("dev"))
+    check = router.guardrail("listing", llm)
+
+    ok, reason = check(type("Output", (), {"raw": "no list here"})())
+
+    assert not ok and "strong" in reason
+    assert llm.model == "strong" and not llm.escalate()
+
+
+def test_token_budget(router):
+    router.budget.max_tokens = 100
+    llm = RoutedLLM(router, "dev", "strong")
+    llm.call("hi")
+    with pytest.raises(BudgetExceededError):
+        llm.call("hi")
+
+
+def test_track_records_failed_calls(router):
+    with pytest.raises(ValueError):
+        with router.track("tool:vision", "strong") as usage:
+            usage["tokens"] = 5
+            raise ValueError("provider error")
+
+    assert router.calls["tool:vision"][0]["tokens"] == 5
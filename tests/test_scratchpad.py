@@ -0,0 +1,66 @@
+from dev_aem_crew_sys.scratchpad import Scratchpad
+
+
+def page(title):
+    style = "\n".join(f"  .rule-{i} {{ color: #{i:03d}; }}" for i in range(80))
+    return f"<html>\n<head>\n<style>\n{style}\n</style>\n</head>\n<body>\n<h1>{title}</h1>\n</body>\n</html>\n"
+
+
+def test_compact_summary_unchanged_and_diff(tmp_path):
+    pad = Scratchpad(str(tmp_path))
+    original = page("Welcome")
+
+    first = pad.compact("File Reader", "path=hero.html", original, scope="convert-1")
+    assert "CSS omitted" in first and "<h1>Welcome</h1>" in first
+    handle = first.split("handle '")[1].split("'")[0]
+    assert pad.get(handle) == original
+    assert (tmp_path / f"{handle}.txt").exists()
+
+    again = pad.compact("File Reader", "path=hero.html", original, scope="convert-1")
+    assert again.startswith("Unchanged since the last identical call")
+
+    edited = pad.compact("File Reader", "path=hero.html", page("Hello"), scope="convert-1")
+    assert edited.startswith("Changes since the last call")
+    assert "-<h1>Welcome</h1>" in edited and "+<h1>Hello</h1>" in edited
+
+
+def test_scopes_do_not_share_history(tmp_path):
+    pad = Scratchpad(str(tmp_path))
+    pad.compact("File Reader", "path=hero.html", page("Welcome"), scope="convert-1")
+
+    other = pad.compact("File Reader", "path=hero.html", page("Welcome"), scope="convert-2")
+
+    # A different task run never saw the first output, so it gets the full summary
+    assert "CSS omitted" in other and "Unchanged" not in other
+
+
+def test_small_outputs_and_errors_pass_through(tmp_path):
+    pad = Scratchpad(str(tmp_path))
+    assert pad.compact("File Reader", "path=a.txt", "short", scope="s") == "short"
+    error = "Error: File not found" + "x" * 3000
+    assert pad.compact("File Reader", "path=b.txt", error, scope="s") == error
+
+
+def test_maven_repeat_keeps_status_line(tmp_path):
+    pad = Scratchpad(str(tmp_path))
+    log = "\n".join(f"[INFO] step {i}" for i in range(30))
+    failed = ("Maven Build FAILED!\n\nProject: /p\nCommand: mvn clean install\nReturn Code: 1\n\n"
+              f"{log}\n[ERROR] HeroModel.java:[12] cannot find symbol")
+
+    first = pad.compact("Maven Build Tool", "cmd", failed, scope="build")
+    second = pad.compact("Maven Build Tool", "cmd", failed.replace("step 3", "step 3b"), scope="build")
+    third = pad.compact("Maven Build Tool", "cmd", failed.replace("step 3", "step 3b"), scope="build")
+
+    assert "[ERROR] HeroModel.java" in first
+    for result in (first, second, third):
+        assert result.startswith("Maven build FAILED (mvn clean install, return code 1).")
+    assert "Changes since the last call" in second
+    assert "Unchanged" in third
+
+
+def test_read_pages_through_lines(tmp_path):
+    pad = Scratchpad(str(tmp_path))
+    handle = pad.put("File Reader", "\n".join(f"line {i}" for i in range(1, 11)))
+
+    assert pad.read(handle, start_line=3, max_lines=2) == "3: line 3\n4: line 4\n[Lines 3-4 of 10. Continue with start_line=5.]"
+    assert pad.read("missing").startswith("Error")
@@ -0,0 +1,224 @@
+import io
+import os
+import threading
+import time
+import zipfile
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from dev_aem_crew_sys.sync import JCR_ROOT, AemSync, build_filters
+
+
+APP = "apps/app/components"
+
+
+def write(root, rel, content=""):
+    path = os.path.join(root, *rel.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return path
+
+
+def roots(filters):
+    return {f.root: f for f in filters}
+
+
+COMPONENT_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<jcr:root xmlns:jcr="http://www.jcp.org/jcr/1.0" xmlns:cq="http://www.day.com/jcr/cq/1.0"
+    jcr:primaryType="cq:Component" jcr:title="Hero">
+    <cq:editConfig jcr:primaryType="cq:EditConfig"/>
+</jcr:root>
+"""
+
+DIALOG_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<jcr:root xmlns:jcr="http://www.jcp.org/jcr/1.0" jcr:primaryType="nt:unstructured"/>
+"""
+
+
+def test_new_component(tmp_path):
+    jcr = str(tmp_path)
+    files = {
+        f"{APP}/hero/.content.xml": COMPONENT_XML,
+        f"{APP}/hero/hero.html": "<div>${model.title}</div>",
+        f"{APP}/hero/_cq_dialog/.content.xml": DIALOG_XML,
+    }
+    for rel, content in files.items():
+        write(jcr, rel, content)
+
+    filters = roots(build_filters(jcr, set(files), set()))
+
+    assert set(filters) == {"/apps/app/components/hero", "/apps/app/components/hero/hero.html",
+                            "/apps/app/components/hero/cq:dialog"}
+    assert filters["/apps/app/components/hero/hero.html"].files == {f"{APP}/hero/hero.html"}
+    # A folder holding only .content.xml is the whole subtree: replace it
+    assert filters["/apps/app/components/hero/cq:dialog"].includes is None
+
+
+def test_content_xml_with_inline_children(tmp_path):
+    jcr = str(tmp_path)
+    write(jcr, f"{APP}/hero/.content.xml", COMPONENT_XML)
+    write(jcr, f"{APP}/hero/hero.html", "<div></div>")
+
+    (entry,) = build_filters(jcr, {f"{APP}/hero/.content.xml"}, set())
+
+    # Only the node itself and its inline children; hero.html is left alone
+    assert entry.root == "/apps/app/components/hero"
+    assert entry.includes == ["/apps/app/components/hero", "/apps/app/components/hero/cq:editConfig(/.*)?"]
+    assert entry.files == {f"{APP}/hero/.content.xml"}
+
+
+def test_flat_dialog_xml(tmp_path):
+    jcr = str(tmp_path)
+    write(jcr, f"{APP}/hero/_cq_dialog.xml", DIALOG_XML)
+
+    (entry,) = build_filters(jcr, {f"{APP}/hero/_cq_dialog.xml"}, set())
+
+    assert entry.root == "/apps/app/components/hero/cq:dialog"
+    assert entry.includes is None
+    assert entry.files == {f"{APP}/hero/_cq_dialog.xml"}
+
+
+def test_deleted_folder_and_file(tmp_path):
+    jcr = str(tmp_path)
+    write(jcr, f"{APP}/hero/hero.html")
+    deleted = {f"{APP}/old/.content.xml", f"{APP}/old/old.html", f"{APP}/hero/hero.js"}
+
+    filters = roots(build_filters(jcr, set(), deleted))
+
+    # The topmost missing node is removed, with no files in the package
+    assert set(filters) == {"/apps/app/components/old", "/apps/app/components/hero/hero.js"}
+    assert all(not f.files for f in filters.values())
+
+
+def test_deleted_flat_dialog(tmp_path):
+    jcr = str(tmp_path)
+    write(jcr, f"{APP}/hero/hero.html")
+
+    filters = roots(build_filters(jcr, set(), {f"{APP}/hero/_cq_dialog.xml"}))
+
+    assert "/apps/app/components/hero/cq:dialog" in filters
+
+
+def test_deleted_file_properties_keep_the_file(tmp_path):
+    jcr = str(tmp_path)
+    write(jcr, f"{APP}/hero/logo.png", "png")
+
+    (entry,) = build_filters(jcr, set(), {f"{APP}/hero/logo.png.dir/.content.xml"})
+
+    # Re-installs the file with default properties instead of deleting it
+    assert entry.root == "/apps/app/components/hero/logo.png"
+    assert entry.files == {f"{APP}/hero/logo.png"}
+
+
+class StandInAem(BaseHTTPRequestHandler):
+    """Package Manager stand-in that records installed packages and can fail on demand."""
+    protocol_version = "HTTP/1.1"
+    packages = []
+    failures = 0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if StandInAem.failures:
+            StandInAem.failures -= 1
+            self.reply(503, "unavailable")
+            return
+        message = BytesParser().parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body
+        )
+        for part in message.get_payload():
+            if part.get_param("name", header="content-disposition") == "file":
+                with zipfile.ZipFile(io.BytesIO(part.get_payload(decode=True))) as package:
+                    StandInAem.packages.append(set(package.namelist()))
+        self.reply(200, '<crx><response><status code="200">ok</status></response></crx>')
+
+    def reply(self, code, text):
+        data = text.encode()
+        self.send_response(code)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def aem():
+    StandInAem.packages = []
+    StandInAem.failures = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInAem)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_watch_retries_failed_push(tmp_path, aem):
+    project = str(tmp_path)
+    jcr = os.path.join(project, JCR_ROOT)
+    write(jcr, f"{APP}/hero/hero.html", "<div>v1</div>")
+    write(jcr, f"{APP}/other/other.css", ".a {}")
+
+    sync = AemSync(project, host=aem, user="admin", password="admin",
+                   interval=0.02, debounce=0.05, retry_delay=0.2)
+    stop = threading.Event()
+    watcher = threading.Thread(target=sync.watch, args=(stop,), daemon=True)
+    watcher.start()
+    try:
+        time.sleep(0.1)
+        StandInAem.failures = 1
+        write(jcr, f"{APP}/hero/hero.html", "<div>v2 edited</div>")
+        # Give the failing push time to happen, then edit another file before the retry
+        assert wait_for(lambda: StandInAem.failures == 0)
+        write(jcr, f"{APP}/other/other.css", ".a { color: red; }")
+
+        pushed = lambda: set().union(*StandInAem.packages) if StandInAem.packages else set()
+        assert wait_for(lambda: {f"jcr_root/{APP}/hero/hero.html",
+                                 f"jcr_root/{APP}/other/other.css"} <= pushed())
+    finally:
+        stop.set()
+        watcher.join(timeout=5)
+
+    assert not watcher.is_alive()
+    for package in StandInAem.packages:
+        assert {"META-INF/vault/filter.xml", "META-INF/vault/properties.xml"} <= package
+    assert sync.latencies
+
+
+def test_latency_starts_at_newest_edit(tmp_path, aem):
+    project = str(tmp_path)
+    jcr = os.path.join(project, JCR_ROOT)
+    write(jcr, f"{APP}/hero/hero.html", "<div>v1</div>")
+
+    sync = AemSync(project, host=aem, user="admin", password="admin", interval=0.02, debounce=0.05)
+    stop = threading.Event()
+    watcher = threading.Thread(target=sync.watch, args=(stop,), daemon=True)
+    watcher.start()
+    try:
+        time.sleep(0.1)
+        # Two edits in one burst, saved 5s and 2s before the poll sees them
+        now = time.time()
+        for rel, age in ((f"{APP}/hero/hero.html", 5), (f"{APP}/hero/hero.css", 2)):
+            # Set the mtime outside the watched tree, so no poll sees the fresh one
+            staged = write(str(tmp_path / "staging"), rel, "edited")
+            os.utime(staged, (now - age, now - age))
+            os.replace(staged, os.path.join(jcr, *rel.split("/")))
+        assert wait_for(lambda: sync.latencies)
+    finally:
+        stop.set()
+        watcher.join(timeout=5)
+
+    (latency,) = sync.latencies
+    assert 2 <= latency < 4